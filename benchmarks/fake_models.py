@@ -0,0 +1,66 @@
+"""
+Deterministic offline models for the benchmarks (no API key, no network).
+
+Call ``install()`` before importing any RAG module: it registers a hashed
+bag-of-words embedding and a mock LLM with ``rag_models.use_models()``, so the
+real pipeline runs unchanged on top of them.
+"""
+
+import hashlib
+import re
+import sys
+from pathlib import Path
+from typing import List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+FAKE_EMBED_DIM = 256
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashEmbedding(BaseEmbedding):
+    """Deterministic offline embedding: signed, hashed token counts, L2-normalized.
+
+    Texts sharing words get similar vectors, so retrieval over it behaves
+    plausibly, and the same text always maps to the same vector.
+    """
+
+    embed_dim: int = FAKE_EMBED_DIM
+
+    def __init__(self, embed_dim: int = FAKE_EMBED_DIM, **kwargs):
+        super().__init__(embed_dim=embed_dim, model_name=f"hash-embedding-{embed_dim}", **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.embed_dim
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            slot = int.from_bytes(digest[:4], "little") % self.embed_dim
+            vector[slot] += 1.0 if digest[4] & 1 else -1.0
+        norm = sum(v * v for v in vector) ** 0.5
+        return [v / norm for v in vector] if norm else vector
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def install(embed_dim: int = FAKE_EMBED_DIM) -> None:
+    """Put src/ on the path and make the RAG modules use the offline models."""
+    from llama_index.core.llms import MockLLM
+
+    if str(SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(SRC_DIR))
+    import rag_models
+
+    rag_models.use_models(MockLLM(max_tokens=64), HashEmbedding(embed_dim=embed_dim))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-call overhead of rebuilding the LiveKit RAG query engine.
+
+Builds a small synthetic index through livekit_rag itself (offline models from
+fake_models.py, so no API key or network is needed), then compares building a
+query engine on every call (the old livekit_rag behaviour) with the cached
+engine returned by livekit_rag.get_query_engine(), and times livekit_rag()
+end to end with the answer cache disabled.
+
+Usage: python benchmarks/query_engine_overhead.py [--calls 200] [--docs 200]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+QUERY = "how do I handle panic attacks"
+
+
+def _per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def _aper_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--docs", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="query-engine-overhead-"))
+    data_dir = workdir / "data"
+    data_dir.mkdir()
+    for i in range(args.docs):
+        (data_dir / f"note_{i:05d}.txt").write_text(
+            f"Wellness note {i}: breathe slowly when panic rises.", encoding="utf-8"
+        )
+    # livekit_rag reads its locations and modes at import time
+    os.environ.update(
+        {
+            "RAG_DATA_DIR": str(data_dir),
+            "RAG_PERSIST_DIR": str(workdir / "query-engine-storage"),
+            "LIVEKIT_RAG_MODE": "synthesize",
+            "EMBEDDING_CACHE_DISABLED": "1",
+            "ANSWER_CACHE_DISABLED": "1",
+            "RAG_RELOAD_INTERVAL": "0",
+        }
+    )
+
+    import fake_models
+
+    fake_models.install()
+    import livekit_rag
+
+    index = livekit_rag.load_index()
+    top_k = livekit_rag.DEFAULT_SIMILARITY_TOP_K
+
+    def rebuild():
+        return index.as_query_engine(use_async=True, similarity_top_k=top_k)
+
+    build_us = _per_call_us(rebuild, args.calls)
+    cached_build_us = _per_call_us(livekit_rag.get_query_engine, args.calls)
+
+    async def rebuilt_query():
+        await rebuild().aquery(QUERY)
+
+    async def cached_query():
+        await livekit_rag.get_query_engine().aquery(QUERY)
+
+    async def livekit_rag_query():
+        await livekit_rag.livekit_rag(QUERY)
+
+    rebuilt_us = asyncio.run(_aper_call_us(rebuilt_query, args.calls))
+    cached_us = asyncio.run(_aper_call_us(cached_query, args.calls))
+    end_to_end_us = asyncio.run(_aper_call_us(livekit_rag_query, args.calls))
+
+    print(f"as_query_engine() construction: {build_us:10.1f} us/call")
+    print(f"get_query_engine() (cached):    {cached_build_us:10.1f} us/call")
+    print(f"query, engine rebuilt per call: {rebuilt_us:10.1f} us/call")
+    print(f"query, get_query_engine():      {cached_us:10.1f} us/call")
+    print(f"livekit_rag() end to end:       {end_to_end_us:10.1f} us/call")
+    print(f"overhead removed per call:      {rebuilt_us - cached_us:10.1f} us")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+RAG indexing and retrieval benchmark over synthetic corpora, fully offline.
+
+For each corpus size a synthetic data directory is generated and a fresh Python
+process runs the real pipeline on the offline models from fake_models.py
+(deterministic hash embeddings and a mock LLM, no API key or network). It times module import,
+recreate_rag_embeddings() (full, no-op and one changed file),
+setup_persistent_index(), create_file_specific_tools() and livekit_rag() query
+latency, and writes the results as JSON for regression tracking.
+
+Usage: python benchmarks/rag_benchmark.py [--sizes 10,100,1000] [--queries 20]
+                                          [--output rag_benchmark.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TOPICS = {
+    "anxiety": "anxiety panic breathing grounding worry heartbeat calm exhale",
+    "sleep": "sleep insomnia bedtime routine melatonin rest dreams caffeine",
+    "stress": "stress workload deadlines burnout boundaries breaks pressure",
+    "mood": "mood sadness motivation journaling gratitude sunlight energy",
+    "relationships": "relationships conflict communication trust loneliness friends",
+    "mindfulness": "mindfulness meditation awareness present body scan attention",
+}
+FILLER = (
+    "the a to and of in that it with for is on as you your can when this be "
+    "try notice feel help day week small step often may"
+).split()
+QUERIES = [
+    "how do I handle panic attacks",
+    "tips for falling asleep faster",
+    "how can I avoid burnout at work",
+    "ways to improve my mood in the morning",
+    "how to talk to a friend after a conflict",
+    "a short mindfulness exercise",
+]
+
+
+def generate_corpus(data_dir: Path, num_docs: int, words_per_doc: int, seed: int = 0) -> None:
+    """Write ``num_docs`` deterministic wellness-themed text files to ``data_dir``."""
+    rng = random.Random(seed)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    topics = list(TOPICS)
+    for i in range(num_docs):
+        topic = topics[i % len(topics)]
+        vocabulary = TOPICS[topic].split() * 3 + FILLER
+        words = [rng.choice(vocabulary) for _ in range(words_per_doc)]
+        sentences = [" ".join(words[j : j + 12]) + "." for j in range(0, len(words), 12)]
+        text = f"{topic.title()} guide {i}\n\n" + " ".join(sentences)
+        (data_dir / f"{topic}_{i:05d}.txt").write_text(text, encoding="utf-8")
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_size(num_docs: int, num_queries: int) -> dict:
+    """Benchmark body, run in a fresh process configured through the environment."""
+    import asyncio
+
+    import fake_models
+
+    fake_models.install()
+    results = {"docs": num_docs}
+
+    start = time.perf_counter()
+    import recreate_rag
+    results["import_recreate_rag_s"] = time.perf_counter() - start
+
+    ok, results["recreate_full_s"] = _timed(recreate_rag.recreate_rag_embeddings, full_rebuild=True)
+    if not ok:
+        raise RuntimeError("recreate_rag_embeddings(full_rebuild=True) failed")
+    _, results["recreate_noop_s"] = _timed(recreate_rag.recreate_rag_embeddings)
+
+    changed = sorted(recreate_rag.DATA_DIR.iterdir())[0]
+    with open(changed, "a", encoding="utf-8") as f:
+        f.write("\nAn added paragraph about breathing slowly when anxious.")
+    _, results["recreate_one_file_s"] = _timed(recreate_rag.recreate_rag_embeddings)
+
+    start = time.perf_counter()
+    import llamaindex_rag
+    results["import_llamaindex_rag_s"] = time.perf_counter() - start
+    index, results["setup_persistent_index_s"] = _timed(llamaindex_rag.setup_persistent_index)
+    _, results["create_file_specific_tools_s"] = _timed(
+        llamaindex_rag.create_file_specific_tools, index
+    )
+
+    import livekit_rag
+
+    async def _queries():
+        latencies = []
+        for i in range(num_queries + 1):
+            start = time.perf_counter()
+            await livekit_rag.livekit_rag(QUERIES[i % len(QUERIES)])
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    latencies = asyncio.run(_queries())
+    warm = latencies[1:] or latencies
+    results["livekit_rag_first_query_s"] = latencies[0]
+    results["livekit_rag_query_p50_s"] = statistics.median(warm)
+    results["livekit_rag_query_p95_s"] = (
+        statistics.quantiles(warm, n=100)[94] if len(warm) > 1 else warm[0]
+    )
+    results["livekit_rag_query_mean_s"] = statistics.fmean(warm)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,100,1000",
+                        help="comma-separated corpus sizes, e.g. 10,100,1000,10000")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--words", type=int, default=300, help="words per document")
+    parser.add_argument("--output", default="rag_benchmark.json")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_size(args.child, args.queries)))
+        return
+
+    runs = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        with tempfile.TemporaryDirectory(prefix=f"rag-bench-{size}-") as workdir:
+            workdir = Path(workdir)
+            generate_corpus(workdir / "data", size, args.words)
+            env = {
+                **os.environ,
+                "RAG_DATA_DIR": str(workdir / "data"),
+                "RAG_PERSIST_DIR": str(workdir / "query-engine-storage"),
+                "RAG_FILE_INDEX_DIR": str(workdir / "file-index-storage"),
+                "EMBEDDING_CACHE_DISABLED": "1",
+                "ANSWER_CACHE_DISABLED": "1",
+                "RAG_RELOAD_INTERVAL": "0",
+            }
+            print(f"Benchmarking {size} documents...", file=sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, __file__, "--child", str(size), "--queries", str(args.queries)],
+                env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                raise SystemExit(f"Benchmark for {size} documents failed")
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            runs.append(result)
+            print(json.dumps(result, indent=2), file=sys.stderr)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            key: os.environ.get(key)
+            for key in (
+                "RAG_VECTOR_STORE",
+                "RAG_STORAGE_FORMAT",
+                "RAG_LOAD_WORKERS",
+                "RAG_PARSE_WORKERS",
+                "RAG_EMBED_BATCH_SIZE",
+                "LIVEKIT_RAG_MODE",
+            )
+        },
+        "words_per_doc": args.words,
+        "queries": args.queries,
+        "runs": runs,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
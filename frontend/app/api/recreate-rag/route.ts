@@ -1,11 +1,58 @@
-import { NextResponse } from 'next/server';
+import { NextRequest, NextResponse } from 'next/server';
 import { spawn } from 'child_process';
 import { join, dirname } from 'path';
 import { existsSync } from 'fs';
 
-export async function POST() {
+// Local indexing service started with `python3 src/recreate_rag.py --serve`
+const INDEXER_URL = process.env.RAG_INDEXER_URL || 'http://127.0.0.1:8765';
+
+async function submitIndexingJob(full: boolean): Promise<Record<string, unknown> | null> {
+  try {
+    const response = await fetch(`${INDEXER_URL}/jobs`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ full }),
+      signal: AbortSignal.timeout(2000),
+    });
+    if (!response.ok) {
+      console.error('Indexing service rejected the job:', response.status);
+      return null;
+    }
+    return await response.json();
+  } catch {
+    // Service not running: fall back to spawning the script
+    return null;
+  }
+}
+
+export async function GET(request: NextRequest) {
+  const jobId = request.nextUrl.searchParams.get('jobId');
+  if (!jobId) {
+    return NextResponse.json({ error: 'jobId is required' }, { status: 400 });
+  }
+  try {
+    const response = await fetch(`${INDEXER_URL}/jobs/${encodeURIComponent(jobId)}`, {
+      signal: AbortSignal.timeout(2000),
+    });
+    const job = await response.json();
+    return NextResponse.json(job, { status: response.status });
+  } catch (error) {
+    console.error('Error polling indexing job:', error);
+    return NextResponse.json({ error: 'Indexing service unavailable' }, { status: 503 });
+  }
+}
+
+export async function POST(request: NextRequest) {
   try {
     console.log('Starting RAG recreation process...');
+
+    const body = await request.json().catch(() => ({}));
+    const job = await submitIndexingJob(Boolean(body?.full));
+    if (job) {
+      console.log(`Submitted indexing job ${job.id} (${job.status})`);
+      return NextResponse.json({ success: true, jobId: job.id, job }, { status: 202 });
+    }
+
     
     const scriptPath = join(process.cwd(), '..', 'src', 'recreate_rag.py');
     console.log('Script path:', scriptPath);
@@ -21,7 +68,7 @@ export async function POST() {
 
     // Run the Python script with proper environment and path setup
     const result = await new Promise<{ stdout: string; stderr: string; code: number }>((resolve) => {
-      const pythonProcess = spawn('python3', [scriptPath], {
+      const pythonProcess = spawn('python3', body?.full ? [scriptPath, '--full'] : [scriptPath], {
         stdio: ['pipe', 'pipe', 'pipe'],
         env: {
           ...process.env,
@@ -59,6 +106,7 @@ export async function POST() {
     if (result.code === 0) {
       console.log('RAG recreation completed successfully');
       return NextResponse.json({ 
+        success: true,
         message: 'Knowledge base updated successfully',
         output: result.stdout 
       });
@@ -3,6 +3,10 @@ import { existsSync } from 'fs';
 import { mkdir, writeFile } from 'fs/promises';
 import { join } from 'path';
 
+// Directory the RAG indexer reads from; in docker-compose.prod.yml this is the
+// rag-data volume shared with the rag-indexer service
+const DATA_DIR = process.env.RAG_DATA_DIR || join(process.cwd(), '..', 'src', 'data');
+
 export async function POST(request: NextRequest) {
   try {
     console.log('Upload request received');
@@ -60,7 +64,7 @@ export async function POST(request: NextRequest) {
     }
 
     // Create data directory if it doesn't exist
-    const dataDir = join(process.cwd(), '..', 'src', 'data');
+    const dataDir = DATA_DIR;
     console.log('Data directory path:', dataDir);
     if (!existsSync(dataDir)) {
       console.log('Creating data directory');
@@ -100,9 +104,8 @@ export async function POST(request: NextRequest) {
 export async function GET() {
   try {
     const { readdir, stat } = await import('fs/promises');
-    const { join } = await import('path');
 
-    const dataDir = join(process.cwd(), '..', 'src', 'data');
+    const dataDir = DATA_DIR;
 
     try {
       const files = await readdir(dataDir);
@@ -144,10 +147,9 @@ export async function GET() {
 
 export async function DELETE() {
   try {
-    const { readdir, unlink } = await import('fs/promises');
-    const { join } = await import('path');
+    const { readdir, unlink, rm } = await import('fs/promises');
 
-    const dataDir = join(process.cwd(), '..', 'src', 'data');
+    const dataDir = DATA_DIR;
 
     try {
       const files = await readdir(dataDir);
@@ -158,16 +160,13 @@ export async function DELETE() {
         await unlink(filePath);
       });
 
-      // Delete all files in the src/query-engine-storage
+      // Delete src/query-engine-storage (a symlink to the published index version)
+      // and the versioned index directories behind it
       const queryEngineStorageDir = join(process.cwd(), '..', 'src', 'query-engine-storage');
-      const queryEngineStorageFiles = await readdir(queryEngineStorageDir);
-      const queryEngineStorageDeletePromises = queryEngineStorageFiles.map(async (fileName) => {
-        const filePath = join(queryEngineStorageDir, fileName);
-        await unlink(filePath);
-      });
 
       await Promise.all(deletePromises);
-      await Promise.all(queryEngineStorageDeletePromises);
+      await rm(queryEngineStorageDir, { recursive: true, force: true });
+      await rm(`${queryEngineStorageDir}.versions`, { recursive: true, force: true });
 
       return NextResponse.json({
         success: true,
@@ -4,6 +4,37 @@ import { useState } from 'react';
 import { BrainIcon } from '@phosphor-icons/react/dist/ssr';
 import { Button } from '@/components/ui/button';
 
+const POLL_INTERVAL_MS = 1000;
+// Give up on a job that is stuck or was lost (e.g. the indexing service restarted)
+const MAX_WAIT_MS = 15 * 60 * 1000;
+
+// Poll the indexing service until the job finishes, fails or the deadline passes
+async function waitForIndexingJob(jobId: string): Promise<boolean> {
+  const deadline = Date.now() + MAX_WAIT_MS;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    // A 404 (unknown job), an unreachable service or a bad response counts as a failure
+    let job;
+    try {
+      const response = await fetch(`/api/recreate-rag?jobId=${encodeURIComponent(jobId)}`);
+      if (!response.ok) {
+        return false;
+      }
+      job = await response.json();
+    } catch (error) {
+      console.error('Error polling indexing job:', error);
+      return false;
+    }
+    if (job.status === 'succeeded') {
+      return true;
+    }
+    if (job.status === 'failed') {
+      return false;
+    }
+  }
+  return false;
+}
+
 export default function UpdateKnowledgeBase() {
   const [isUpdating, setIsUpdating] = useState(false);
 
@@ -22,7 +53,8 @@ export default function UpdateKnowledgeBase() {
 
         if (response.ok) {
           const result = await response.json();
-          if (result.success) {
+          const succeeded = result.jobId ? await waitForIndexingJob(result.jobId) : result.success;
+          if (succeeded) {
             alert('Knowledge base updated successfully! The AI can now use the new information.');
           } else {
             alert('Failed to update knowledge base. Please try again.');
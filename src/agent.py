@@ -4,6 +4,8 @@ import random
 from datetime import datetime
 
 import asyncio
+import concurrent.futures
+from typing import Optional
 from anyio import Path
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -33,56 +35,59 @@ logger = logging.getLogger("agent")
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
 load_dotenv(dotenv_path)
-supabase_url = os.environ.get("SUPABASE_URL")
-supabase_key = os.environ.get("SUPABASE_SERVICE_KEY") or os.environ.get("SUPABASE_KEY")
 
-# Initialize Supabase Client
-supabase = None
-try:
-    from supabase import create_client, Client
-    if supabase_url and supabase_key:
-        supabase: Client = create_client(supabase_url, supabase_key)
-        logger.info("✅ Connected to Supabase!")
-    else:
-        logger.warning("⚠️ Supabase credentials missing. Database features will be disabled.")
-except ImportError:
-    logger.warning("⚠️ Supabase library not installed. Database features will be disabled.")
-except Exception as e:
-    logger.error(f"❌ Failed to connect to Supabase: {e}")
+# Shared Supabase client (None when not configured); queries go through
+# db.execute so they never block the event loop driving real-time audio
+from db import execute, get_supabase
+supabase = get_supabase()
+
+# Worker-level per-user cache (context and BYOK keys) for reconnecting users
+from user_cache import cache_stats, cached_load, invalidate_user, user_key_cache
 
 # ========== BYOK: Bring Your Own Key Functions ==========
+async def _fetch_user_gemini_key(user_id: str) -> Optional[str]:
+    """Return the user's own Gemini API key, or None to use the platform key.
+
+    Raises on DB errors.
+    """
+    result = await execute(supabase.table('profiles').select(
+        'encrypted_gemini_key', 'subscription_tier'
+    ).eq('id', user_id).single())
+    
+    if result.data:
+        api_key = result.data.get('encrypted_gemini_key')
+        tier = result.data.get('subscription_tier', 'byok_free')
+        
+        if api_key:
+            logger.info(f"✅ Using user's BYOK API key (tier: {tier})")
+            return api_key
+        elif tier == 'premium_plus':
+            return None
+    
+    logger.warning(f"⚠️ User {user_id} has no API key, using platform key")
+    return None
+
 async def get_user_gemini_key(user_id: str) -> str:
     """Fetch user's Gemini API key from Supabase. Falls back to platform key."""
     if not supabase:
         return os.environ.get("GOOGLE_API_KEY")
     
     try:
-        result = supabase.table('profiles').select(
-            'encrypted_gemini_key', 'subscription_tier'
-        ).eq('id', user_id).single().execute()
-        
-        if result.data:
-            api_key = result.data.get('encrypted_gemini_key')
-            tier = result.data.get('subscription_tier', 'byok_free')
-            
-            if api_key:
-                logger.info(f"✅ Using user's BYOK API key (tier: {tier})")
-                return api_key
-            elif tier == 'premium_plus':
-                return os.environ.get("GOOGLE_API_KEY")
-        
-        logger.warning(f"⚠️ User {user_id} has no API key, using platform key")
-        return os.environ.get("GOOGLE_API_KEY")
+        # Only the user's own key is cached (None is never cached), and only
+        # briefly, so adding a key takes effect on the next join and a revoked
+        # key stops being used within USER_KEY_CACHE_TTL; errors are not cached
+        api_key = await cached_load(user_key_cache, user_id, lambda: _fetch_user_gemini_key(user_id))
     except Exception as e:
         logger.error(f"❌ Error fetching user API key: {e}")
-        return os.environ.get("GOOGLE_API_KEY")
+        api_key = None
+    return api_key or os.environ.get("GOOGLE_API_KEY")
 
 async def check_session_limit(user_id: str) -> dict:
     """Check if user has sessions remaining this month."""
     if not supabase:
         return {'allowed': True, 'remaining': 999}
     try:
-        result = supabase.rpc('can_start_session', {'p_user_id': user_id}).execute()
+        result = await execute(supabase.rpc('can_start_session', {'p_user_id': user_id}))
         return result.data if result.data else {'allowed': True}
     except Exception as e:
         logger.error(f"Session limit check error: {e}")
@@ -93,48 +98,79 @@ async def increment_session_usage(user_id: str):
     if not supabase:
         return
     try:
-        supabase.rpc('increment_session_count', {'p_user_id': user_id}).execute()
+        await execute(supabase.rpc('increment_session_count', {'p_user_id': user_id}))
     except Exception as e:
         logger.error(f"Session increment error: {e}")
 
-# LAZY import for RAG - moved to function to avoid blocking agent startup
-_livekit_rag_func = None
-_livekit_rag_initialized = False
+# RAG for LiveKit - loaded in the background by prewarm() so neither worker startup
+# nor the first voice turn waits for the index to load
+_rag_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="rag-prewarm"
+)
+_livekit_rag_future: Optional[concurrent.futures.Future] = None
+
+
+def _load_livekit_rag():
+    """Import livekit_rag, load its index and query engine, and watch for new versions (prewarm thread)."""
+    from livekit_rag import livekit_rag, load_index, start_index_watcher, warm_components
+    load_index()
+    warm_components()
+    start_index_watcher(on_reload=_on_index_reloaded)
+    return livekit_rag
+
+
+def _on_index_reloaded(version_dir):
+    """Rebuild the LlamaIndex agent in the background once a new index is published."""
+    if _llamaindex_initialized and workflow_agent is not None:
+        _rag_executor.submit(_reload_llamaindex)
+
+
+def _start_livekit_rag_loading() -> concurrent.futures.Future:
+    """Start loading the RAG index in the background, once per process."""
+    global _livekit_rag_future
+    if _livekit_rag_future is None:
+        _livekit_rag_future = _rag_executor.submit(_load_livekit_rag)
+    return _livekit_rag_future
+
 
 async def _get_livekit_rag():
-    """Lazy load livekit_rag to avoid startup timeout."""
-    global _livekit_rag_func, _livekit_rag_initialized
-    if _livekit_rag_initialized:
-        return _livekit_rag_func
-    
+    """Wait until the prewarmed RAG index is ready (starting the load if needed)."""
+    global _livekit_rag_future
     try:
-        logger.info("Initializing LiveKit RAG (first use)...")
-        from livekit_rag import livekit_rag
-        _livekit_rag_func = livekit_rag
-        logger.info("✅ LiveKit RAG initialized")
+        rag_func = await asyncio.wrap_future(_start_livekit_rag_loading())
+        return rag_func
     except Exception as e:
         logger.warning(f"Failed to load livekit_rag: {e}")
+        _livekit_rag_future = None  # retry the load on the next call
         async def _fallback(query: str):
             return "RAG is not available at the moment."
-        _livekit_rag_func = _fallback
-    
-    _livekit_rag_initialized = True
-    return _livekit_rag_func
+        return _fallback
+
+# Semantic answer cache shared by the RAG tools
+try:
+    from answer_cache import answer_cache_stats, cached_answer
+except Exception as e:
+    logger.warning(f"Failed to load answer_cache: {e}")
+    async def cached_answer(namespace, query, compute, index_version, embed_model=None):
+        return await compute()
+    def answer_cache_stats(): return None
 
 # Imports for RAG with LlamaIndex - made optional and LAZY to avoid startup timeout
 _llamaindex_initialized = False
 workflow_agent, index, file_tools = None, None, None
+_llamaindex_version = 0
 
 def _init_llamaindex():
     """Lazy initialization of LlamaIndex to avoid blocking agent startup."""
-    global _llamaindex_initialized, workflow_agent, index, file_tools
+    global _llamaindex_initialized, workflow_agent, index, file_tools, _llamaindex_version
     if _llamaindex_initialized:
         return workflow_agent, index, file_tools
     
     try:
         logger.info("Initializing LlamaIndex (first use)...")
-        from llamaindex_rag import setup_combined_agent
+        from llamaindex_rag import loaded_index_version, setup_combined_agent
         workflow_agent, index, file_tools = setup_combined_agent()
+        _llamaindex_version = loaded_index_version()
         logger.info("✅ LlamaIndex initialized successfully")
     except Exception as e:
         logger.warning(f"Failed to load llamaindex_rag: {e}")
@@ -143,6 +179,20 @@ def _init_llamaindex():
     _llamaindex_initialized = True
     return workflow_agent, index, file_tools
 
+
+def _reload_llamaindex():
+    """Build a LlamaIndex agent over the new index, then swap it in."""
+    global workflow_agent, index, file_tools, _llamaindex_version
+    try:
+        from llamaindex_rag import loaded_index_version, setup_combined_agent
+        new_agent, new_index, new_tools = setup_combined_agent()
+        new_version = loaded_index_version()
+        workflow_agent, index, file_tools = new_agent, new_index, new_tools
+        _llamaindex_version = new_version
+        logger.info("✅ LlamaIndex reloaded with the new index")
+    except Exception as e:
+        logger.warning(f"Failed to reload llamaindex_rag, keeping the current agent: {e}")
+
 # Import for AutoGen Operator - made optional
 try:
     from autogen_operator import run_operator_task, search_therapists_near, book_therapy_appointment, get_crisis_help
@@ -193,6 +243,10 @@ except Exception as e:
 GEMINI_VOICES = ["Kore", "Aoede", "Charon", "Fenrir", "Puck"]
 DEFAULT_VOICE = "Kore"
 
+# How long session start waits for the frontend's voice / Gen Z preferences
+# before starting with defaults (later preferences are applied live)
+PREFERENCES_WAIT_TIMEOUT = float(os.getenv("AGENT_PREFERENCES_WAIT_TIMEOUT", "1.0"))
+
 
 def parse_participant_metadata(metadata: str) -> dict:
     """Parse participant metadata to extract voice and mode preferences."""
@@ -208,6 +262,67 @@ def parse_participant_metadata(metadata: str) -> dict:
     return {}
 
 
+def resolve_preferences(prefs: dict, voice: str = DEFAULT_VOICE, genz_mode: bool = False) -> tuple:
+    """Return ``(voice, genz_mode)`` from parsed metadata, keeping the given values as defaults."""
+    genz_mode = bool(prefs.get("genz_mode", genz_mode))
+    requested_voice = prefs.get("voice", voice)
+    if requested_voice in GEMINI_VOICES:
+        voice = requested_voice
+    return voice, genz_mode
+
+
+class ParticipantPreferences:
+    """Voice / Gen Z preferences from participant metadata, driven by room events.
+
+    Reads metadata already present when the agent connects, then listens for
+    ``participant_connected`` and ``participant_metadata_changed`` instead of
+    polling, so preferences are picked up as soon as the frontend sets them.
+    """
+
+    def __init__(self, room) -> None:
+        self.prefs: Optional[dict] = None
+        self._found = asyncio.Event()
+        self._callbacks = []
+        room.on("participant_connected", self._on_participant_connected)
+        room.on("participant_metadata_changed", self._on_metadata_changed)
+
+        for participant in room.remote_participants.values():
+            self._update(participant.metadata)
+        # Also check local participant metadata (the user connecting)
+        local_participant = getattr(room, "local_participant", None)
+        if local_participant is not None:
+            self._update(local_participant.metadata)
+
+    def _on_participant_connected(self, participant) -> None:
+        self._update(participant.metadata)
+
+    def _on_metadata_changed(self, participant, old_metadata: str, metadata: str) -> None:
+        self._update(metadata)
+
+    def _update(self, metadata: str) -> None:
+        prefs = parse_participant_metadata(metadata)
+        if not prefs:
+            return
+        self.prefs = prefs
+        self._found.set()
+        for callback in list(self._callbacks):
+            try:
+                callback(prefs)
+            except Exception as e:
+                logger.error(f"Error applying participant preferences: {e}")
+
+    def on_change(self, callback) -> None:
+        """Call ``callback(prefs)`` whenever preferences arrive or change."""
+        self._callbacks.append(callback)
+
+    async def wait(self, timeout: float) -> Optional[dict]:
+        """Wait up to ``timeout`` seconds for preferences; None if none arrived."""
+        try:
+            await asyncio.wait_for(self._found.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.prefs
+
 
 class Assistant(Agent):
     def __init__(self) -> None:
@@ -233,7 +348,7 @@ class Assistant(Agent):
                 return "I'm currently unable to connect to the therapist network directly. Please visit the Therapist Directory on your dashboard."
 
             # Find a random available therapist for now (in production, use matching logic)
-            therapist_response = supabase.table('therapists').select('id, profile:profiles(full_name)').limit(1).execute()
+            therapist_response = await execute(supabase.table('therapists').select('id, profile:profiles(full_name)').limit(1))
             
             if not therapist_response.data:
                 return "I couldn't find an available therapist immediately. I've logged your request and someone will contact you shortly."
@@ -246,17 +361,17 @@ class Assistant(Agent):
             
             # Create session request
             # For demo, using a placeholder user ID if we can't find one, or hardcoding the first user for safety
-            user_response = supabase.table('profiles').select('id').limit(1).execute()
+            user_response = await execute(supabase.table('profiles').select('id').limit(1))
             user_id = user_response.data[0]['id'] if user_response.data else None
             
             if user_id:
-                supabase.table('therapist_session_requests').insert({
+                await execute(supabase.table('therapist_session_requests').insert({
                     "user_id": user_id,
                     "therapist_id": therapist['id'],
                     "urgency": urgency,
                     "issue_summary": issue_summary,
                     "status": "pending"
-                }).execute()
+                }))
                 
                 return f"I've sent a request to Dr. {therapist.get('profile', {}).get('full_name', 'Therapist')}. They have been notified and will review your request shortly. Please check your dashboard for updates."
             else:
@@ -285,7 +400,7 @@ class Assistant(Agent):
             
             if supabase:
                 # Find user (simplified logic as above)
-                user_response = supabase.table('profiles').select('id').limit(1).execute()
+                user_response = await execute(supabase.table('profiles').select('id').limit(1))
                 user_id = user_response.data[0]['id'] if user_response.data else None
                 
                 if user_id:
@@ -304,11 +419,12 @@ class Assistant(Agent):
                         "p_mood": mood_score 
                     }) # Or just insert metric directly:
                     
-                    supabase.table('wellness_metrics').insert({
+                    await execute(supabase.table('wellness_metrics').insert({
                         "user_id": user_id,
                         "mental_health_score": min(100, mood_score * 10),
                         "recorded_at": datetime.now().strftime("%Y-%m-%d")
-                    }).execute() # This might fail unique constraint, but handling simply for now
+                    })) # This might fail unique constraint, but handling simply for now
+                    invalidate_user(user_id)
                     
             return "I've noted that in your wellness journal."
             
@@ -361,14 +477,16 @@ class Assistant(Agent):
     @function_tool
     async def LiveKit_RAG_tool(self, context: RunContext, query: str):
         """
-        Use this tool to get the data quickly from Livekit RAG model
+        Use this tool to get the data quickly from Livekit RAG model.
+        It returns an answer or the most relevant knowledge base passages with
+        their sources; answer the user from them in your own words.
 
         Args:
             query: The query to get the data for
         """
 
         try:
-            # Lazy load RAG to avoid startup timeout
+            # Waits for the index prewarmed in prewarm() if it is still loading
             rag_func = await _get_livekit_rag()
             response = await rag_func(query)
             logger.info(f"Livekit RAG Response: {response}")
@@ -392,10 +510,15 @@ class Assistant(Agent):
             agent, _, _ = _init_llamaindex()
             if not agent:
                 return "Deep reasoning is not available at the moment."
-            
-            response = await agent.run(query)
+
+            async def _run_agent():
+                return str(await agent.run(query))
+
+            response = await cached_answer(
+                "llamaindex:agent", query, _run_agent, _llamaindex_version
+            )
             logger.info(f"Workflow Response: {response}")
-            return str(response)
+            return response
 
         except Exception as e:
             logger.error(f"Error during workflow execution: {e}")
@@ -553,7 +676,7 @@ Recent Activity:
                 query = query.contains('specializations', [specialty.lower()])
             
             # Order by rating and limit results
-            result = query.order('rating', desc=True).limit(max_results).execute()
+            result = await execute(query.order('rating', desc=True).limit(max_results))
             
             if not result.data:
                 return f"No therapists found matching '{specialty}'. I recommend checking our full Therapist Directory at /therapist-directory for all available therapists."
@@ -581,8 +704,52 @@ You can view profiles and book sessions at /therapist-directory. Would you like
 
 
 def prewarm(proc: JobProcess):
-    # No need for VAD prewarming with Gemini Live API
-    pass
+    # No need for VAD prewarming with Gemini Live API.
+    # Load the RAG index and query engine in the background; the tool awaits the
+    # same per-process future (see _get_livekit_rag) instead of importing lazily.
+    _start_livekit_rag_loading()
+
+
+def extract_user_id(room_name: Optional[str]) -> Optional[str]:
+    """Extract the user ID from a ``mindcure-{USER_ID}-{RANDOM_SUFFIX}`` room name."""
+    if not room_name or not room_name.startswith("mindcure-"):
+        return None
+    # UUIDs contain hyphens, so we can't just split by hyphen and take index 0
+    # We assume USER_ID is a UUID (36 chars) or at least the part before the last hyphen if appended
+    parts = room_name.replace("mindcure-", "").split("-")
+
+    # Reconstruct UUID if it was split
+    # Standard UUID has 4 hyphens. 
+    if len(parts) >= 5:
+        # likely a UUID
+        return "-".join(parts[:5])
+    # Fallback for simple IDs
+    return parts[0]
+
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+_background_tasks = set()
+
+
+def _fire_and_forget(coro, name: str):
+    """Run ``coro`` in the background, logging (not raising) its failure."""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception():
+            logger.error(f"Background task {name} failed: {t.exception()}")
+
+    task.add_done_callback(_done)
+    return task
+
+
+async def _check_session_limit(user_id: str):
+    """Log users over their monthly session limit (the limit is not enforced here)."""
+    session_check = await check_session_limit(user_id)
+    if not session_check.get('allowed', True):
+        logger.warning(f"⚠️ User {user_id} exceeded session limit")
 
 
 async def entrypoint(ctx: JobContext):
@@ -590,99 +757,80 @@ async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {
         "room": ctx.room.name,
     }
-    
+
+    # Extract user_id from the job's room name (known before connecting), and
+    # start all user-keyed DB work right away so it overlaps the connection
+    # and the metadata wait below
+    user_id = extract_user_id(ctx.job.room.name)
+    context_task = None
+    byok_task = None
+    if user_id:
+        logger.info(f"Extracted user_id from room name: {user_id}")
+        context_task = asyncio.create_task(load_user_context(user_id))
+        byok_task = asyncio.create_task(get_user_gemini_key(user_id))
+        # The session limit is only logged, so it doesn't wait on a database
+        # round-trip
+        _fire_and_forget(_check_session_limit(user_id), "check_session_limit")
+
     # Connect first
-    await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+    try:
+        await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+    except BaseException:
+        # Don't leave the user-keyed work running (or its errors unretrieved)
+        for task in (context_task, byok_task):
+            if task is not None:
+                task.cancel()
+        raise
+
+    # Only connected sessions count towards usage; accounting is not needed to
+    # start talking, so it doesn't wait on a database round-trip
+    if user_id:
+        _fire_and_forget(increment_session_usage(user_id), "increment_session_usage")
     
-    # Extract user_id from room metadata
-    user_id = None
-    personalized_instructions = AGENT_INSTRUCTIONS
     selected_voice = DEFAULT_VOICE
     genz_mode = False
-    
-    try:
-        # Try to get user_id from room name pattern
-        room_name = ctx.room.name
-        if room_name and room_name.startswith("mindcure-"):
-            # Format: mindcure-{USER_ID}-{RANDOM_SUFFIX}
-            # UUIDs contain hyphens, so we can't just split by hyphen and take index 0
-            # We assume USER_ID is a UUID (36 chars) or at least the part before the last hyphen if appended
-            
-            parts = room_name.replace("mindcure-", "").split("-")
-            
-            # Reconstruct UUID if it was split
-            # Standard UUID has 4 hyphens. 
-            if len(parts) >= 5:
-                # likely a UUID
-                user_id = "-".join(parts[:5])
-            else:
-                # Fallback for simple IDs
-                user_id = parts[0]
-                
-            logger.info(f"Extracted user_id from room name: {user_id}")
-        
-        # Check for existing participants (non-blocking)
-        # Wait a bit for the frontend to set metadata after connection
-        for attempt in range(5):  # Try up to 5 times over 2.5 seconds
-            for participant in ctx.room.remote_participants.values():
-                if participant.metadata:
-                    prefs = parse_participant_metadata(participant.metadata)
-                    genz_mode = prefs.get("genz_mode", False)
-                    requested_voice = prefs.get("voice", DEFAULT_VOICE)
-                    if requested_voice in GEMINI_VOICES:
-                        selected_voice = requested_voice
-                    logger.info(f"🎙️ Voice: {selected_voice}, Gen Z Mode: {genz_mode}")
-                    break
-            
-            # Also check local participant metadata (the user connecting)
-            local_meta = ctx.room.local_participant.metadata if hasattr(ctx.room, 'local_participant') else None
-            if local_meta:
-                prefs = parse_participant_metadata(local_meta)
-                genz_mode = prefs.get("genz_mode", genz_mode)
-                requested_voice = prefs.get("voice", selected_voice)
-                if requested_voice in GEMINI_VOICES:
-                    selected_voice = requested_voice
-                logger.info(f"🎙️ From local participant - Voice: {selected_voice}, Gen Z Mode: {genz_mode}")
-                break
-            
-            if genz_mode or selected_voice != DEFAULT_VOICE:
-                break  # Found settings, stop waiting
-                
-            await asyncio.sleep(0.5)  # Wait 500ms before trying again
-        
-        # Select the appropriate prompt based on mode
-        base_instructions = GENZ_AGENT_INSTRUCTIONS if genz_mode else AGENT_INSTRUCTIONS
-        
-        # If we have a user_id, load their context
-        if user_id:
-            user_context = await load_user_context(user_id)
-            personalized_instructions = build_personalized_instructions(
-                base_instructions, 
-                user_context
-            )
+    user_context = None
+
+    # Wait for voice / Gen Z preferences while the user context loads; if the
+    # frontend is slower than the deadline, start with defaults and apply its
+    # preferences live once they arrive
+    preferences = ParticipantPreferences(ctx.room)
+    prefs = await preferences.wait(PREFERENCES_WAIT_TIMEOUT)
+    if prefs:
+        selected_voice, genz_mode = resolve_preferences(prefs)
+        logger.info(f"🎙️ Voice: {selected_voice}, Gen Z Mode: {genz_mode}")
+    else:
+        logger.info(f"No preferences within {PREFERENCES_WAIT_TIMEOUT}s, starting with defaults")
+
+    # If we have a user_id, use their context (already loading since job start)
+    if context_task:
+        try:
+            user_context = await context_task
             logger.info(f"✅ Loaded personalized context for user {user_context.get('name', 'Unknown')}")
-        else:
-            personalized_instructions = base_instructions
-            logger.info("No user_id found, using default instructions")
-            
-    except Exception as e:
-        logger.warning(f"Error loading user context: {e}, using default instructions")
+        except Exception as e:
+            logger.warning(f"Error loading user context: {e}, using default instructions")
+    else:
+        logger.info("No user_id found, using default instructions")
+
+    def _instructions_for(genz: bool) -> str:
+        # Select the appropriate prompt based on mode
+        base_instructions = GENZ_AGENT_INSTRUCTIONS if genz else AGENT_INSTRUCTIONS
+        if user_context:
+            try:
+                return build_personalized_instructions(base_instructions, user_context)
+            except Exception as e:
+                logger.warning(f"Error personalizing instructions: {e}, using default instructions")
+        return base_instructions
+
+    personalized_instructions = _instructions_for(genz_mode)
 
     # ========== BYOK: Get user's API key ==========
     user_api_key = os.environ.get("GOOGLE_API_KEY")  # Default to platform key
     
-    if user_id:
+    if byok_task:
         try:
-            # Check session limit
-            session_check = await check_session_limit(user_id)
-            if not session_check.get('allowed', True):
-                logger.warning(f"⚠️ User {user_id} exceeded session limit")
-            
-            # Get user's BYOK API key
-            user_api_key = await get_user_gemini_key(user_id)
-            
-            # Increment session count
-            await increment_session_usage(user_id)
+            # BYOK key fetch (cached for reconnecting users), started at job start
+            user_api_key = await byok_task
             logger.info(f"✅ BYOK session started for {user_id}")
         except Exception as e:
             logger.error(f"BYOK error: {e}")
@@ -690,15 +838,37 @@ async def entrypoint(ctx: JobContext):
 
     # Create session with Gemini Live API (speech-to-speech)
     # Using gemini-2.5-flash-native-audio-preview for better audio support
-    session = AgentSession(
-        llm=google.beta.realtime.RealtimeModel(
-            model="gemini-2.5-flash-native-audio-preview-09-2025",
-            voice=selected_voice,
-            temperature=0.8,
-            instructions=personalized_instructions,
-            api_key=user_api_key,  # BYOK: Use user's key or platform key
-        ),
+    realtime_model = google.beta.realtime.RealtimeModel(
+        model="gemini-2.5-flash-native-audio-preview-09-2025",
+        voice=selected_voice,
+        temperature=0.8,
+        instructions=personalized_instructions,
+        api_key=user_api_key,  # BYOK: Use user's key or platform key
     )
+    session = AgentSession(llm=realtime_model)
+    assistant = Assistant()
+
+    def _apply_late_preferences(prefs: dict):
+        nonlocal selected_voice, genz_mode
+        voice, new_genz_mode = resolve_preferences(prefs, selected_voice, genz_mode)
+        if voice == selected_voice and new_genz_mode == genz_mode:
+            return
+        logger.info(f"🎙️ Preferences updated - Voice: {voice}, Gen Z Mode: {new_genz_mode}")
+        if voice != selected_voice:
+            selected_voice = voice
+            # Applies to the live Gemini session (reconnecting it with the new voice)
+            realtime_model.update_options(voice=voice)
+        if new_genz_mode != genz_mode:
+            genz_mode = new_genz_mode
+            _fire_and_forget(
+                assistant.update_instructions(_instructions_for(genz_mode)),
+                "update_instructions",
+            )
+
+    preferences.on_change(_apply_late_preferences)
+    # Preferences may have arrived while the context and API key were loading
+    if preferences.prefs:
+        _apply_late_preferences(preferences.prefs)
 
     # Log metrics
     usage_collector = metrics.UsageCollector()
@@ -711,12 +881,16 @@ async def entrypoint(ctx: JobContext):
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        answer_stats = await asyncio.to_thread(answer_cache_stats)
+        if answer_stats is not None:
+            logger.info(f"Answer cache: {answer_stats}")
+        logger.info(f"User cache: {cache_stats()}")
 
     ctx.add_shutdown_callback(log_usage)
 
     # Start the session
     await session.start(
-        agent=Assistant(),
+        agent=assistant,
         room=ctx.room,
         room_input_options=RoomInputOptions(
             noise_cancellation=noise_cancellation.BVC(),
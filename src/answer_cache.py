@@ -0,0 +1,348 @@
+"""
+Semantic answer cache for RAG queries.
+
+Users ask the same handful of questions across sessions, so answers are cached
+by query embedding: a new query that is close enough (cosine similarity above a
+threshold) to a cached one is answered from the cache. Entries expire after a
+TTL and are ignored once the index version recorded by recreate_rag changes.
+
+SQLite work runs on a worker thread (the cache is used from the agent's event
+loop and the database is shared by every worker process on the host). Hit
+rate and saved latency are exported through answer_cache_stats() and logged
+every ANSWER_CACHE_STATS_INTERVAL seconds.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("answer_cache")
+
+THIS_DIR = Path(__file__).parent
+DEFAULT_CACHE_PATH = THIS_DIR / "embedding-cache" / "answers.sqlite3"
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 2000
+# Stores between pruning passes (stale versions, expired and overflow entries)
+DEFAULT_PRUNE_EVERY = 50
+STATS_LOG_INTERVAL = float(os.getenv("ANSWER_CACHE_STATS_INTERVAL", "300"))
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    row = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(row)
+    return row / norm if norm else row
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed by query embedding, stored in SQLite.
+
+    The database is shared by every worker process on the host. Each process
+    keeps the vectors of the namespaces it queries in memory and reloads them
+    when another process commits (detected through ``PRAGMA data_version``).
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        prune_every: int = DEFAULT_PRUNE_EVERY,
+    ):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prune_every = max(1, prune_every)
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        # (namespace, index_version) -> (row ids, created_at, normalized vectors, (answer, latency) rows)
+        self._matrices: Dict[Tuple[str, int], Tuple[np.ndarray, np.ndarray, np.ndarray, list]] = {}
+        self._data_version: Optional[int] = None
+        # row id -> last hit time, written to the database on the next store
+        self._accessed: Dict[int, float] = {}
+        self._stores_since_prune = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                query TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                index_version INTEGER NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_answers_lookup ON answers(namespace, index_version)"
+        )
+        self._conn.commit()
+
+    def _sync_with_db(self) -> None:
+        """Drop the in-memory vectors if another connection has written."""
+        (data_version,) = self._conn.execute("PRAGMA data_version").fetchone()
+        if data_version != self._data_version:
+            self._matrices.clear()
+            self._data_version = data_version
+
+    def _matrix(self, namespace: str, index_version: int):
+        key = (namespace, index_version)
+        if key not in self._matrices:
+            rows = self._conn.execute(
+                "SELECT id, created_at, vector, answer, latency FROM answers "
+                "WHERE namespace = ? AND index_version = ?",
+                key,
+            ).fetchall()
+            if rows:
+                ids = np.array([row[0] for row in rows], dtype=np.int64)
+                created = np.array([row[1] for row in rows], dtype=np.float64)
+                vectors = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            else:
+                ids = np.empty(0, dtype=np.int64)
+                created = np.empty(0, dtype=np.float64)
+                vectors = np.empty((0, 0), dtype=np.float32)
+            answers = [(row[3], row[4]) for row in rows]
+            self._matrices[key] = (ids, created, vectors, answers)
+        return self._matrices[key]
+
+    def lookup(
+        self, namespace: str, vector: List[float], index_version: int
+    ) -> Optional[Tuple[str, float]]:
+        """Return ``(answer, original latency)`` for the closest cached query, if close enough.
+
+        Blocking (SQLite); call it off the event loop.
+        """
+        query = _normalize(vector)
+        now = time.time()
+        with self._lock:
+            self._sync_with_db()
+            ids, created, vectors, answers = self._matrix(namespace, index_version)
+            if len(ids) and vectors.shape[1] == query.shape[0]:
+                scores = vectors @ query
+                scores[created < now - self.ttl_seconds] = -1.0
+                i = int(np.argmax(scores))
+                if scores[i] >= self.threshold:
+                    # recorded in memory; persisted with the next store
+                    self._accessed[int(ids[i])] = now
+                    self.hits += 1
+                    return answers[i]
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        namespace: str,
+        query: str,
+        vector: List[float],
+        answer: str,
+        index_version: int,
+        latency: float,
+    ) -> None:
+        """Cache an answer; every ``prune_every`` stores, drop stale versions,
+        expired and least recently used entries.
+
+        Blocking (SQLite); call it off the event loop.
+        """
+        now = time.time()
+        row = _normalize(vector)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (namespace, query, vector, answer, index_version, "
+                "latency, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (namespace, query, row.tobytes(), answer, index_version, latency, now, now),
+            )
+            if self._accessed:
+                self._conn.executemany(
+                    "UPDATE answers SET last_access = ? WHERE id = ?",
+                    [(ts, row_id) for row_id, ts in self._accessed.items()],
+                )
+                self._accessed.clear()
+            self._stores_since_prune += 1
+            pruned = self._stores_since_prune >= self.prune_every
+            if pruned:
+                self._stores_since_prune = 0
+                self._prune(index_version, now)
+            self._conn.commit()
+            # our own commits do not change data_version, so update the
+            # in-memory vectors here: append the new row, or reload everything
+            # after a prune
+            if pruned:
+                self._matrices.clear()
+            else:
+                self._append_row(
+                    (namespace, index_version), cursor.lastrowid, now, row, (answer, latency)
+                )
+
+    def _append_row(self, key, row_id: int, created_at: float, row: np.ndarray, answer) -> None:
+        if key not in self._matrices:
+            return
+        ids, created, vectors, answers = self._matrices[key]
+        if len(ids) and vectors.shape[1] != row.shape[0]:
+            del self._matrices[key]
+            return
+        self._matrices[key] = (
+            np.append(ids, np.int64(row_id)),
+            np.append(created, created_at),
+            np.vstack([vectors, row]) if len(ids) else row[np.newaxis, :],
+            answers + [answer],
+        )
+
+    def _prune(self, index_version: int, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM answers WHERE index_version < ? OR created_at < ?",
+            (index_version, now - self.ttl_seconds),
+        )
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM answers WHERE id IN "
+                "(SELECT id FROM answers ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def record_saving(self, seconds: float) -> None:
+        """Add to the latency saved by cache hits."""
+        with self._lock:
+            self.saved_seconds += max(0.0, seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._matrices.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit rate and saved latency for this process (counts entries in SQLite)."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[SemanticAnswerCache] = None
+_shared_cache_disabled = False
+_shared_cache_lock = threading.Lock()
+_stats_logged_at = time.monotonic()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Return the process-wide answer cache, or None when it is disabled/unavailable."""
+    global _shared_cache, _shared_cache_disabled
+    with _shared_cache_lock:
+        if _shared_cache is None and not _shared_cache_disabled:
+            if os.getenv("ANSWER_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+                _shared_cache_disabled = True
+                return None
+            try:
+                _shared_cache = SemanticAnswerCache(
+                    Path(os.getenv("ANSWER_CACHE_PATH", str(DEFAULT_CACHE_PATH))),
+                    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+                    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                )
+            except Exception as e:
+                logger.warning(f"Answer cache unavailable: {e}")
+                _shared_cache_disabled = True
+        return _shared_cache
+
+
+def answer_cache_stats() -> Optional[Dict[str, Any]]:
+    """Return hits, misses, hit rate and saved latency of the process-wide cache.
+
+    None until the cache has been used (or when it is disabled). Blocking
+    (counts entries in SQLite); call it off the event loop.
+    """
+    with _shared_cache_lock:
+        cache = _shared_cache
+    return cache.stats() if cache is not None else None
+
+
+async def cached_answer(
+    namespace: str,
+    query: str,
+    compute: Callable[[], Awaitable[str]],
+    index_version: int,
+    embed_model=None,
+) -> str:
+    """Answer ``query`` from the semantic cache, or run ``compute`` and cache the result.
+
+    ``namespace`` separates answers produced by different tools or settings.
+    """
+    cache = get_answer_cache()
+    if cache is None:
+        return await compute()
+
+    start = time.perf_counter()
+    try:
+        if embed_model is None:
+            from llama_index.core import Settings
+            embed_model = Settings.embed_model
+        vector = await embed_model.aget_query_embedding(query)
+        hit = await asyncio.to_thread(cache.lookup, namespace, vector, index_version)
+    except Exception as e:
+        logger.warning(f"Answer cache lookup failed: {e}")
+        return await compute()
+
+    if hit is not None:
+        answer, original_latency = hit
+        cache.record_saving(original_latency - (time.perf_counter() - start))
+        logger.info(f"Answer cache hit for {query!r} ({namespace})")
+        await _maybe_log_stats(cache)
+        return answer
+
+    start = time.perf_counter()
+    answer = await compute()
+    try:
+        await asyncio.to_thread(
+            cache.store, namespace, query, vector, answer, index_version, time.perf_counter() - start
+        )
+    except Exception as e:
+        logger.warning(f"Could not cache answer: {e}")
+    await _maybe_log_stats(cache)
+    return answer
+
+
+async def _maybe_log_stats(cache: SemanticAnswerCache) -> None:
+    """Log hit rate and saved latency at most every STATS_LOG_INTERVAL seconds."""
+    global _stats_logged_at
+    now = time.monotonic()
+    if STATS_LOG_INTERVAL <= 0 or now - _stats_logged_at < STATS_LOG_INTERVAL:
+        return
+    _stats_logged_at = now
+    try:
+        logger.info(f"Answer cache: {await asyncio.to_thread(cache.stats)}")
+    except Exception as e:
+        logger.warning(f"Could not read answer cache stats: {e}")
@@ -0,0 +1,76 @@
+"""
+Shared Supabase access layer for the agent.
+
+One Supabase client per process, so agent.py and user_context.py share a
+single pooled, keep-alive HTTP connection pool. The supabase-py client is
+synchronous, so ``execute()`` runs queries on a small dedicated thread pool
+with a timeout instead of blocking the event loop that drives real-time audio.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("db")
+
+DB_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "5"))
+DB_MAX_WORKERS = int(os.getenv("SUPABASE_MAX_WORKERS", "8"))
+
+_client = None
+_client_initialized = False
+_client_lock = threading.Lock()
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=DB_MAX_WORKERS, thread_name_prefix="supabase-io"
+)
+
+
+def get_supabase():
+    """Return the process-wide Supabase client, or None when unavailable.
+
+    Credentials are read on first use, so callers can load their .env first.
+    """
+    global _client, _client_initialized
+    with _client_lock:
+        if _client_initialized:
+            return _client
+        _client_initialized = True
+
+        supabase_url = os.environ.get("SUPABASE_URL")
+        supabase_key = os.environ.get("SUPABASE_SERVICE_KEY") or os.environ.get("SUPABASE_KEY")
+        try:
+            from supabase import ClientOptions, create_client
+
+            if supabase_url and supabase_key:
+                _client = create_client(
+                    supabase_url,
+                    supabase_key,
+                    options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT),
+                )
+                logger.info("✅ Connected to Supabase!")
+            else:
+                logger.warning("⚠️ Supabase credentials missing. Database features will be disabled.")
+        except ImportError:
+            logger.warning("⚠️ Supabase library not installed. Database features will be disabled.")
+        except Exception as e:
+            logger.error(f"❌ Failed to connect to Supabase: {e}")
+        return _client
+
+
+async def run(fn: Callable[..., Any], *args: Any, timeout: Optional[float] = DB_TIMEOUT) -> Any:
+    """Run a blocking database call on the I/O pool, bounded by ``timeout`` seconds."""
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, fn, *args)
+    return await asyncio.wait_for(future, timeout)
+
+
+async def execute(query: Any, timeout: Optional[float] = DB_TIMEOUT) -> Any:
+    """Execute a Supabase query builder without blocking the event loop.
+
+    Build the query as usual and pass it in place of calling ``.execute()``:
+
+        result = await execute(supabase.table("profiles").select("*").eq("id", user_id))
+    """
+    return await run(query.execute, timeout=timeout)
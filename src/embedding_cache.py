@@ -0,0 +1,303 @@
+"""
+Persistent embedding cache shared by all RAG entry points.
+
+Vectors are stored in a small SQLite database keyed by embedding model name and
+a hash of the normalized chunk text, so rebuilds, per-file tools and evaluator
+runs reuse embeddings instead of calling the embedding API again. The async
+embedding methods do their SQLite work on a worker thread, so lookups never
+block the agent's event loop.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger("embedding_cache")
+
+THIS_DIR = Path(__file__).parent
+DEFAULT_CACHE_PATH = THIS_DIR / "embedding-cache" / "embeddings.sqlite3"
+DEFAULT_MAX_ENTRIES = 200_000
+# Buffered access times are written once this many are pending, or when the
+# oldest is this many seconds old, so read-mostly workloads stay bounded too
+DEFAULT_ACCESS_FLUSH_ENTRIES = 1000
+DEFAULT_ACCESS_FLUSH_SECONDS = 60.0
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different chunks share a cache entry."""
+    return " ".join(text.split())
+
+
+def normalize_model_name(model_name: str) -> str:
+    """Drop the optional ``models/`` prefix: both spellings name the same Gemini model."""
+    return model_name[len("models/"):] if model_name.startswith("models/") else model_name
+
+
+def cache_key(model_name: str, kind: str, text: str) -> str:
+    """Build the cache key for a text under a given model and embedding kind."""
+    payload = f"{normalize_model_name(model_name)}\x00{kind}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Size-bounded LRU cache of embedding vectors stored in SQLite."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        access_flush_entries: int = DEFAULT_ACCESS_FLUSH_ENTRIES,
+        access_flush_seconds: float = DEFAULT_ACCESS_FLUSH_SECONDS,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.access_flush_entries = max(1, access_flush_entries)
+        self.access_flush_seconds = access_flush_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> last hit time, written to the database with the next put, or
+        # by a get once a flush threshold is reached
+        self._accessed: Dict[str, float] = {}
+        self._accessed_since: Optional[float] = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for ``keys``; missing entries come back as None."""
+        if not keys:
+            return []
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            # stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            # access times are buffered and written in batches
+            for key in found:
+                self._accessed[key] = now
+            if self._accessed:
+                if self._accessed_since is None:
+                    self._accessed_since = now
+                if (
+                    len(self._accessed) >= self.access_flush_entries
+                    or now - self._accessed_since >= self.access_flush_seconds
+                ):
+                    self._flush_accessed()
+                    self._conn.commit()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Look up a single vector."""
+        return self.get_many([key])[0]
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """Store vectors and evict least recently used entries over the size bound."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            self._flush_accessed()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                rows,
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                logger.debug(f"Evicted {overflow} least recently used embeddings")
+            self._conn.commit()
+
+    def _flush_accessed(self) -> None:
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._accessed.items()],
+            )
+            self._accessed.clear()
+        self._accessed_since = None
+
+    def put(self, key: str, vector: List[float]) -> None:
+        """Store a single vector."""
+        self.put_many({key: vector})
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current entry count."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper that serves repeated texts from an EmbeddingCache."""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, **kwargs: Any):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    def _keys(self, kind: str, texts: Sequence[str]) -> List[str]:
+        return [cache_key(self.model_name, kind, text) for text in texts]
+
+    def _split_misses(self, kind: str, texts: List[str]):
+        keys = self._keys(kind, texts)
+        cached = self._cache.get_many(keys)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        return keys, cached, missing
+
+    def _merge(self, keys, cached, missing, fresh) -> List[List[float]]:
+        self._cache.put_many({keys[i]: vector for i, vector in zip(missing, fresh)})
+        for i, vector in zip(missing, fresh):
+            cached[i] = vector
+        return cached
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        key = cache_key(self.model_name, "query", query)
+        vector = self._cache.get(key)
+        if vector is None:
+            vector = self._inner.get_query_embedding(query)
+            self._cache.put(key, vector)
+        return vector
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        key = cache_key(self.model_name, "query", query)
+        vector = await asyncio.to_thread(self._cache.get, key)
+        if vector is None:
+            vector = await self._inner.aget_query_embedding(query)
+            await asyncio.to_thread(self._cache.put, key, vector)
+        return vector
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._split_misses("text", texts)
+        fresh = []
+        if missing:
+            fresh = self._inner.get_text_embedding_batch([texts[i] for i in missing])
+        return self._merge(keys, cached, missing, fresh)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = await asyncio.to_thread(self._split_misses, "text", texts)
+        fresh = []
+        if missing:
+            fresh = await self._inner.aget_text_embedding_batch(
+                [texts[i] for i in missing]
+            )
+        return await asyncio.to_thread(self._merge, keys, cached, missing, fresh)
+
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide cache, configured from the environment."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            path = Path(os.getenv("EMBEDDING_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+            max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+            _shared_cache = EmbeddingCache(path, max_entries=max_entries)
+            logger.info(f"Embedding cache at {path} ({len(_shared_cache)} entries)")
+        return _shared_cache
+
+
+def cached_embed_model(embed_model: BaseEmbedding) -> BaseEmbedding:
+    """Wrap ``embed_model`` with the shared on-disk cache.
+
+    Set EMBEDDING_CACHE_DISABLED=1 to use the raw model. Already wrapped models
+    are returned unchanged, so every RAG module can call this safely.
+    """
+    if isinstance(embed_model, CachedEmbedding):
+        return embed_model
+    if os.getenv("EMBEDDING_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return embed_model
+    try:
+        return CachedEmbedding(embed_model, get_embedding_cache())
+    except Exception as e:
+        logger.warning(f"Embedding cache unavailable, using uncached model: {e}")
+        return embed_model
@@ -0,0 +1,384 @@
+"""
+Index build pipeline for the RAG modules.
+
+Streams documents from the data directory file by file (parsed in a process
+pool, with a bounded number of files in flight), splits them into nodes, embeds
+the nodes in configurable batches with bounded async concurrency and rate-limit
+aware backoff, and inserts them into a VectorStoreIndex.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import random
+import threading
+from collections import deque
+from functools import partial
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from llama_index.core import Document, Settings, StorageContext, VectorStoreIndex
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
+from llama_index.core.schema import BaseNode, MetadataMode
+
+import index_worker
+from rag_index import (
+    discard_index_version,
+    load_file_documents,
+    publish_index_version,
+    save_manifest,
+    scan_data_dir,
+    stage_index_version,
+)
+from vector_stores import new_storage_context
+
+logger = logging.getLogger("index_pipeline")
+
+# Tunables, overridable through the environment
+EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("RAG_EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("RAG_EMBED_MAX_RETRIES", "6"))
+FILES_PER_BATCH = int(os.getenv("RAG_FILES_PER_BATCH", "8"))
+LOAD_WORKERS = int(os.getenv("RAG_LOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_WORKERS = int(os.getenv("RAG_PARSE_WORKERS", str(LOAD_WORKERS)))
+
+# Progress callback: (stage, done, total)
+ProgressCallback = Callable[[str, int, int], None]
+
+_RETRYABLE_MARKERS = (
+    "429",
+    "rate limit",
+    "ratelimit",
+    "resource_exhausted",
+    "resource exhausted",
+    "quota",
+    "503",
+    "unavailable",
+    "timeout",
+    "timed out",
+)
+
+
+def log_progress(stage: str, done: int, total: int) -> None:
+    """Default progress callback: log every step at INFO level."""
+    logger.info(f"[{stage}] {done}/{total}")
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Whether an embedding error looks like rate limiting or a transient outage."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in _RETRYABLE_MARKERS)
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from sync code, even inside a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Called from async code (e.g. an agent tool): use a private loop in a thread
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+async def aembed_nodes(
+    nodes: Sequence[BaseNode],
+    embed_model=None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_CONCURRENCY,
+    max_retries: int = EMBED_MAX_RETRIES,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> None:
+    """Embed nodes in place, ``batch_size`` texts per request, ``concurrency`` requests at a time.
+
+    Nodes that already carry an embedding are left untouched. Rate-limited or
+    transient failures are retried with exponential backoff and jitter.
+    """
+    embed_model = embed_model or Settings.embed_model
+    pending = [node for node in nodes if node.embedding is None]
+    if not pending:
+        return
+
+    batches = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async def _embed_batch(batch: List[BaseNode]) -> None:
+        nonlocal done
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch]
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                try:
+                    embeddings = await embed_model.aget_text_embedding_batch(texts)
+                    break
+                except Exception as e:
+                    if attempt >= max_retries or not is_retryable_error(e):
+                        raise
+                    delay = min(60.0, 2**attempt) + random.uniform(0, 1)
+                    logger.warning(
+                        f"Embedding batch failed ({e}), retrying in {delay:.1f}s "
+                        f"(attempt {attempt + 1}/{max_retries})"
+                    )
+                    await asyncio.sleep(delay)
+        for node, embedding in zip(batch, embeddings):
+            node.embedding = embedding
+        done += len(batch)
+        if progress_callback:
+            progress_callback("embed", done, len(pending))
+
+    await asyncio.gather(*(_embed_batch(batch) for batch in batches))
+
+
+def iter_file_documents(
+    data_dir: Path, file_names: Sequence[str]
+) -> Iterator[Tuple[str, List[Document]]]:
+    """Yield ``(file name, documents)`` one file at a time."""
+    for name in file_names:
+        try:
+            yield name, load_file_documents(data_dir / name)
+        except Exception as e:
+            logger.error(f"Error loading {name}: {e}")
+
+
+_process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> Optional[concurrent.futures.ProcessPoolExecutor]:
+    """Process-wide pool for CPU-bound loading and chunking, created on first use.
+
+    Returns None when RAG_LOAD_WORKERS and RAG_PARSE_WORKERS are both 1. The
+    pool uses spawn: forking a process that runs an event loop and HTTP
+    clients is unsafe. Workers run the entry points in index_worker.
+    """
+    global _process_pool
+    workers = max(LOAD_WORKERS, PARSE_WORKERS)
+    if workers <= 1:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=index_worker.init_worker,
+                initargs=(logging.getLogger().getEffectiveLevel(),),
+            )
+        return _process_pool
+
+
+def _discard_process_pool(pool: concurrent.futures.ProcessPoolExecutor) -> None:
+    """Forget a broken pool so the next caller starts a fresh one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def stable_node_id(i: int, doc: BaseNode) -> str:
+    """Node ID derived from the source document ID and chunk position."""
+    return f"{doc.id_}_node_{i}"
+
+
+def chunking_transformations(transformations: Optional[List[Any]] = None) -> List[Any]:
+    """``transformations`` (default: Settings.transformations) with stable node IDs.
+
+    Node parsers are copied with ``id_func=stable_node_id`` so that a document
+    always yields the same node IDs, however documents are sharded.
+    """
+    transformations = transformations or Settings.transformations or [SentenceSplitter()]
+    return [
+        t.model_copy(update={"id_func": stable_node_id}) if isinstance(t, NodeParser) else t
+        for t in transformations
+    ]
+
+
+def _shards(items: Sequence[Any], count: int) -> List[Sequence[Any]]:
+    """Split ``items`` into at most ``count`` contiguous, order-preserving shards."""
+    size = -(-len(items) // max(1, count))
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+async def aparse_nodes(
+    documents: Sequence[Document],
+    transformations: Optional[List[Any]] = None,
+    workers: int = PARSE_WORKERS,
+) -> List[BaseNode]:
+    """Chunk ``documents`` into nodes, sharded across ``workers`` processes.
+
+    Shards are contiguous and merged in order, and node IDs are stable, so the
+    result is the same as a single-process run.
+    """
+    transformations = chunking_transformations(transformations)
+    pool = get_process_pool() if workers > 1 and len(documents) > 1 else None
+    if pool is None:
+        return list(run_transformations(documents, transformations))
+
+    parse = partial(index_worker.parse_documents, transformations=transformations)
+    try:
+        results = await asyncio.gather(
+            *(
+                asyncio.wrap_future(pool.submit(parse, shard))
+                for shard in _shards(documents, workers)
+            )
+        )
+    except concurrent.futures.process.BrokenProcessPool as e:
+        logger.warning(f"Parse pool failed ({e}), chunking in-process")
+        _discard_process_pool(pool)
+        return list(run_transformations(documents, transformations))
+    return [node for shard_nodes in results for node in shard_nodes]
+
+
+def parse_nodes(
+    documents: Sequence[Document],
+    transformations: Optional[List[Any]] = None,
+    workers: int = PARSE_WORKERS,
+) -> List[BaseNode]:
+    """Synchronous wrapper around aparse_nodes."""
+    return run_sync(aparse_nodes(documents, transformations, workers=workers))
+
+
+async def aiter_file_documents(
+    data_dir: Path,
+    file_names: Sequence[str],
+    workers: int = LOAD_WORKERS,
+    max_in_flight: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, List[Document]]]:
+    """Yield ``(file name, documents)`` in order, parsing files in the process pool.
+
+    PDF parsing is CPU-bound, so files are parsed in worker processes while
+    the caller embeds earlier batches. At most ``max_in_flight`` files (default
+    ``2 * workers``) are parsed ahead, which keeps memory independent of corpus
+    size. With ``workers <= 1`` files are parsed in this process.
+    """
+    pool = get_process_pool() if workers > 1 and len(file_names) > 1 else None
+    if pool is None:
+        for name, documents in iter_file_documents(data_dir, file_names):
+            yield name, documents
+        return
+
+    max_in_flight = max_in_flight or 2 * workers
+    remaining = iter(file_names)
+    in_flight: deque = deque()
+
+    def _submit_next() -> None:
+        name = next(remaining, None)
+        if name is not None:
+            in_flight.append((name, pool.submit(index_worker.load_file, data_dir / name)))
+
+    for _ in range(max_in_flight):
+        _submit_next()
+    while in_flight:
+        name, future = in_flight.popleft()
+        _submit_next()
+        try:
+            documents = await asyncio.wrap_future(future)
+        except Exception as e:
+            logger.error(f"Error loading {name}: {e}")
+            if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+                _discard_process_pool(pool)
+                raise
+            continue
+        yield name, documents
+
+
+async def abuild_index(
+    data_dir: Path,
+    file_hashes: Optional[Dict[str, str]] = None,
+    storage_context: Optional[StorageContext] = None,
+    transformations: Optional[List[Any]] = None,
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    embed_concurrency: int = EMBED_CONCURRENCY,
+    files_per_batch: int = FILES_PER_BATCH,
+    load_workers: int = LOAD_WORKERS,
+    parse_workers: int = PARSE_WORKERS,
+    progress_callback: Optional[ProgressCallback] = log_progress,
+) -> Tuple[VectorStoreIndex, Dict[str, Dict[str, Any]]]:
+    """Build a vector index over ``data_dir`` through the batched pipeline.
+
+    Files are processed ``files_per_batch`` at a time so that only one group of
+    parsed documents and nodes is held in memory before being inserted; the
+    next files are parsed by ``load_workers`` processes meanwhile, and each
+    group is chunked across ``parse_workers`` processes.
+
+    Returns:
+        Tuple of (index, manifest files) ready to be persisted with save_manifest.
+    """
+    file_hashes = scan_data_dir(data_dir) if file_hashes is None else file_hashes
+    storage_context = storage_context or new_storage_context()
+    index = VectorStoreIndex(nodes=[], storage_context=storage_context)
+    manifest_files: Dict[str, Dict[str, Any]] = {}
+    file_names = list(file_hashes)
+
+    group: List[Tuple[str, List[Document]]] = []
+    files_done = 0
+
+    async def _flush() -> None:
+        nonlocal files_done
+        documents = [doc for _, docs in group for doc in docs]
+        nodes = await aparse_nodes(documents, transformations, workers=parse_workers)
+        await aembed_nodes(
+            nodes,
+            batch_size=embed_batch_size,
+            concurrency=embed_concurrency,
+            progress_callback=progress_callback,
+        )
+        index.insert_nodes(nodes)
+        for doc in documents:
+            index.docstore.set_document_hash(doc.id_, doc.hash)
+        for name, docs in group:
+            manifest_files[name] = {
+                "hash": file_hashes[name],
+                "doc_ids": [doc.id_ for doc in docs],
+            }
+        files_done += len(group)
+        group.clear()
+        if progress_callback:
+            progress_callback("files", files_done, len(file_names))
+
+    async for name, docs in aiter_file_documents(data_dir, file_names, workers=load_workers):
+        group.append((name, docs))
+        if len(group) >= files_per_batch:
+            await _flush()
+    if group:
+        await _flush()
+
+    return index, manifest_files
+
+
+def build_index(data_dir: Path, **kwargs: Any) -> Tuple[VectorStoreIndex, Dict[str, Dict[str, Any]]]:
+    """Synchronous wrapper around abuild_index."""
+    return run_sync(abuild_index(data_dir, **kwargs))
+
+
+def build_and_persist_index(data_dir: Path, persist_dir: Path, **kwargs: Any) -> VectorStoreIndex:
+    """Build an index over ``data_dir`` into a new version and publish it at ``persist_dir``.
+
+    Readers of the previously published index are unaffected until the swap.
+    """
+    version_dir = stage_index_version(persist_dir)
+    try:
+        kwargs.setdefault("storage_context", new_storage_context(persist_dir=version_dir))
+        index, manifest_files = build_index(data_dir, **kwargs)
+        index.storage_context.persist(persist_dir=version_dir)
+        save_manifest(version_dir, manifest_files)
+    except Exception:
+        discard_index_version(version_dir)
+        raise
+    publish_index_version(persist_dir, version_dir)
+    return index
@@ -0,0 +1,33 @@
+"""
+Entry points for index_pipeline's worker processes.
+
+The pool uses spawn, so each worker imports this module and whatever it needs
+for parsing and chunking, plus the parent's ``__main__`` script. The RAG entry
+points therefore keep model and embedding cache setup out of import time (see
+recreate_rag.configure()), and workers never configure models themselves.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, List, Sequence
+
+from llama_index.core import Document
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode
+
+from rag_index import load_file_documents
+
+
+def init_worker(log_level: int = logging.INFO) -> None:
+    """Pool initializer: give the worker the parent's log level."""
+    logging.basicConfig(level=log_level)
+
+
+def load_file(path: Path) -> List[Document]:
+    """Parse one file."""
+    return load_file_documents(path)
+
+
+def parse_documents(documents: Sequence[Document], transformations: List[Any]) -> List[BaseNode]:
+    """Chunk one shard of documents."""
+    return list(run_transformations(documents, transformations))
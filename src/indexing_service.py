@@ -0,0 +1,199 @@
+"""
+Long-lived local indexing service for recreate_rag.
+
+Keeps the interpreter, LlamaIndex/Google SDK imports and clients warm between
+uploads. Rebuild requests become jobs on a single worker queue; a request made
+while another job is still waiting to start is coalesced into that job, since
+one run picks up every file changed in the meantime.
+
+The service queues one sync job at startup, so it also replaces a separate
+recreate_rag run before serving.
+
+HTTP API (bound to localhost):
+    POST /jobs          {"full": false} -> 202 with the (possibly coalesced) job
+    GET  /jobs/<id>     job status and progress
+    GET  /health        liveness check
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("indexing_service")
+
+DEFAULT_HOST = os.getenv("RAG_INDEXER_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("RAG_INDEXER_PORT", "8765"))
+MAX_FINISHED_JOBS = 50
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Runs one rebuild: (full_rebuild, progress_callback) -> success
+JobRunner = Callable[[bool, Callable[[str, int, int], None]], bool]
+
+
+class IndexingJobQueue:
+    """Single-worker job queue that coalesces rebuild requests."""
+
+    def __init__(self, runner: JobRunner):
+        self.runner = runner
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._run, name="indexing-worker", daemon=True
+            )
+            self._worker.start()
+
+    def submit(self, full_rebuild: bool = False) -> Dict[str, Any]:
+        """Queue a rebuild, or join the job that is already waiting to start."""
+        with self._lock:
+            if self._pending is not None:
+                job = self._pending
+                job["full"] = job["full"] or full_rebuild
+                job["requests"] += 1
+                logger.info(f"Coalesced rebuild request into job {job['id']}")
+                return dict(job)
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "status": QUEUED,
+                "full": full_rebuild,
+                "requests": 1,
+                "progress": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._jobs[job["id"]] = job
+            self._pending = job
+            self._trim()
+        self._queue.put(job)
+        logger.info(f"Queued rebuild job {job['id']} (full={full_rebuild})")
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _trim(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in (SUCCEEDED, FAILED)
+        ]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                # requests arriving from now on need a new job
+                if self._pending is job:
+                    self._pending = None
+                job["status"] = RUNNING
+                job["started_at"] = time.time()
+                full_rebuild = job["full"]
+
+            def _progress(stage: str, done: int, total: int) -> None:
+                with self._lock:
+                    job["progress"] = {"stage": stage, "done": done, "total": total}
+
+            try:
+                success = self.runner(full_rebuild, _progress)
+                error = None if success else "Rebuild failed, see the indexer log"
+            except Exception as e:
+                logger.error(f"Rebuild job {job['id']} failed: {e}")
+                success, error = False, str(e)
+
+            with self._lock:
+                job["status"] = SUCCEEDED if success else FAILED
+                job["error"] = error
+                job["finished_at"] = time.time()
+            logger.info(f"Rebuild job {job['id']} {job['status']}")
+
+
+def _make_handler(jobs: IndexingJobQueue):
+    class IndexingRequestHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "healthy"})
+            elif self.path.startswith("/jobs/"):
+                job = jobs.get(self.path[len("/jobs/"):])
+                if job:
+                    self._send(200, job)
+                else:
+                    self._send(404, {"error": "Unknown job"})
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                self._send(404, {"error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                self._send(400, {"error": "Invalid JSON body"})
+                return
+            if not isinstance(body, dict):
+                self._send(400, {"error": "JSON body must be an object"})
+                return
+            self._send(202, jobs.submit(full_rebuild=bool(body.get("full", False))))
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return IndexingRequestHandler
+
+
+def serve(
+    runner: JobRunner,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    sync_on_start: bool = True,
+) -> None:
+    """Run the indexing service until interrupted.
+
+    With ``sync_on_start`` the first job brings the index up to date with the
+    data directory; it runs on the worker like any other job, so a failed sync
+    is only logged and the service keeps serving.
+    """
+    jobs = IndexingJobQueue(runner)
+    jobs.start()
+    if sync_on_start:
+        jobs.submit()
+    server = ThreadingHTTPServer((host, port), _make_handler(jobs))
+    logger.info(f"Indexing service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
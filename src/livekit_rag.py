@@ -1,16 +1,16 @@
 from dotenv import load_dotenv
-from llama_index.core import (
-    SimpleDirectoryReader,
-    StorageContext,
-    VectorStoreIndex,
-    load_index_from_storage,
-    Settings,
-)
-from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
+from answer_cache import cached_answer
+from index_pipeline import build_and_persist_index
+from rag_index import DATA_DIR, PERSIST_DIR, current_index_dir, read_index_version
+from rag_models import configure_models
+from vector_stores import load_persisted_index
 from pathlib import Path
+import asyncio
 import logging
 import os
+import threading
+import time
+from typing import Callable, List, Optional
 
 logger = logging.getLogger("livekit_rag")
 
@@ -19,48 +19,234 @@ env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
 # Configure LlamaIndex to use native Gemini models
-Settings.llm = GoogleGenAI(
-    model="gemini-2.0-flash",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.7,
-)
+configure_models(llm_model="gemini-2.0-flash", embedding_model="text-embedding-004")
 
-Settings.embed_model = GoogleGenAIEmbedding(
-    model="text-embedding-004",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-)
+# Loaded once per process by load_index(), normally from the agent's prewarm
+index = None
+index_version = 0
+_index_lock = threading.Lock()
 
-# RAG with Livekit
-# check if storage already exists
-THIS_DIR = Path(__file__).parent
-PERSIST_DIR = THIS_DIR / "query-engine-storage"
+# Hot reload: the published index version directory currently loaded, and the
+# interval at which the watcher checks whether recreate_rag published a new one
+RELOAD_INTERVAL = float(os.getenv("RAG_RELOAD_INTERVAL", "5"))
+_loaded_dir: Optional[Path] = None
+_reload_listeners: List[Callable[[Path], None]] = []
+_watcher_thread: Optional[threading.Thread] = None
 
+# Query engines and retrievers reused across calls, keyed by (kind, similarity_top_k),
+# and the index they were built for; swapped together with the index under
+# _index_lock
+DEFAULT_SIMILARITY_TOP_K = 2
+_query_engines = {}
+_engines_index = None
 
-# check if data directory exists
-if not (THIS_DIR / "data").exists():
-    logger.error("Data directory does not exist")
+# "synthesize" (default): answer with a full retrieve + Gemini synthesis query.
+# "retrieve" (opt-in): return the top-k passages for the realtime model to answer from.
+RAG_MODE = os.getenv("LIVEKIT_RAG_MODE", "synthesize").lower()
+RETRIEVE_TOP_K = int(os.getenv("LIVEKIT_RAG_TOP_K", "4"))
+RETRIEVE_TOKEN_BUDGET = int(os.getenv("LIVEKIT_RAG_TOKEN_BUDGET", "800"))
 
-    # create empty data directory
-    (THIS_DIR / "data").mkdir(parents=True, exist_ok=True)
 
+def load_index():
+    """Load the persisted index (building it on first run) once per process.
 
-if not PERSIST_DIR.exists():
-    # load the documents and create the index
-    documents = SimpleDirectoryReader(THIS_DIR / "data").load_data()
-    index = VectorStoreIndex.from_documents(documents)
-    # store it for later
-    index.storage_context.persist(persist_dir=PERSIST_DIR)
-else:
-    # load the existing index
-    storage_context = StorageContext.from_defaults(persist_dir=PERSIST_DIR)
-    index = load_index_from_storage(storage_context)
+    Safe to call from a background thread. With RAG_STORAGE_FORMAT=binary the
+    vectors are memory-mapped, so every job process shares the same pages.
+    """
+    global index, index_version, _loaded_dir
+    with _index_lock:
+        if index is not None:
+            return index
 
+        # check if data directory exists
+        if not DATA_DIR.exists():
+            logger.error("Data directory does not exist")
 
-async def livekit_rag(query: str):
-    logger.info(f"Querying info for {query}")
-    query_engine = index.as_query_engine(use_async=True)
-    res = await query_engine.aquery(query)
-    return str(res)
+            # create empty data directory
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+        if not PERSIST_DIR.exists():
+            # load the documents, embed them in concurrent batches and store the index
+            index = build_and_persist_index(DATA_DIR, PERSIST_DIR)
+            _loaded_dir = current_index_dir(PERSIST_DIR)
+        else:
+            # load the existing index from the version it currently points to
+            _loaded_dir = current_index_dir(PERSIST_DIR)
+            index = load_persisted_index(_loaded_dir)
+        index_version = read_index_version(_loaded_dir)
+        logger.info("LiveKit RAG index loaded")
+    return index
 
 
+def reload_index_if_changed() -> bool:
+    """Load a newly published index version and swap it in.
+
+    The new index and the engines/retrievers cached for the old one are built
+    before the swap, here, off the query path; queries keep using the old ones
+    until then.
+    """
+    global index, index_version, _loaded_dir, _query_engines, _engines_index
+    published = current_index_dir(PERSIST_DIR)
+    if published is None or published == _loaded_dir:
+        return False
+
+    logger.info(f"New index version published at {published}, reloading")
+    new_index = load_persisted_index(published)
+    new_version = read_index_version(published)
+    with _index_lock:
+        keys = set(_query_engines) | {_default_component_key()}
+    new_components = {key: _build_component(new_index, *key) for key in keys}
+    with _index_lock:
+        index, index_version, _loaded_dir = new_index, new_version, published
+        _query_engines, _engines_index = new_components, new_index
+    logger.info("LiveKit RAG index reloaded")
+
+    for listener in list(_reload_listeners):
+        try:
+            listener(published)
+        except Exception as e:
+            logger.warning(f"Index reload listener failed: {e}")
+    return True
+
+
+def _watch_index(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            reload_index_if_changed()
+        except Exception as e:
+            logger.error(f"Index reload failed: {e}")
+
+
+def start_index_watcher(
+    interval: float = RELOAD_INTERVAL,
+    on_reload: Optional[Callable[[Path], None]] = None,
+):
+    """Start the background thread that hot-reloads new index versions (once per process)."""
+    global _watcher_thread
+    if on_reload is not None and on_reload not in _reload_listeners:
+        _reload_listeners.append(on_reload)
+    if _watcher_thread is None and interval > 0:
+        _watcher_thread = threading.Thread(
+            target=_watch_index, args=(interval,), name="rag-index-watcher", daemon=True
+        )
+        _watcher_thread.start()
+
+
+def _build_component(rag_index, kind: str, similarity_top_k: int):
+    if kind == "engine":
+        return rag_index.as_query_engine(use_async=True, similarity_top_k=similarity_top_k)
+    return rag_index.as_retriever(similarity_top_k=similarity_top_k)
+
+
+def _default_component_key():
+    """The (kind, similarity_top_k) livekit_rag() uses by default."""
+    if RAG_MODE == "retrieve":
+        return ("retriever", RETRIEVE_TOP_K)
+    return ("engine", DEFAULT_SIMILARITY_TOP_K)
+
+
+def _cached_component(kind: str, similarity_top_k: int):
+    """Return the engine/retriever cached for the current index, building it if missing."""
+    global _query_engines, _engines_index
+    if index is None:
+        load_index()
+    key = (kind, similarity_top_k)
+    with _index_lock:
+        rag_index = index
+        if _engines_index is not rag_index:
+            _query_engines, _engines_index = {}, rag_index
+        component = _query_engines.get(key)
+    if component is None:
+        component = _build_component(rag_index, kind, similarity_top_k)
+        with _index_lock:
+            # unless a reload swapped the index meanwhile
+            if _engines_index is rag_index:
+                component = _query_engines.setdefault(key, component)
+    return component
+
+
+def get_query_engine(similarity_top_k: int = DEFAULT_SIMILARITY_TOP_K):
+    """Return the cached query engine for ``similarity_top_k``.
+
+    Engines (retriever, synthesizer and prompts) are built once per top-k value
+    and reused across calls; a reload replaces them with engines for the new index.
+    """
+    return _cached_component("engine", similarity_top_k)
+
+
+def get_retriever(similarity_top_k: int = RETRIEVE_TOP_K):
+    """Return the cached retriever for ``similarity_top_k``."""
+    return _cached_component("retriever", similarity_top_k)
+
+
+def warm_components():
+    """Build the engine or retriever livekit_rag() uses, so the first query doesn't."""
+    _cached_component(*_default_component_key())
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting prompt space
+    return max(1, len(text) // 4)
+
+
+def format_passages(nodes, token_budget: int = RETRIEVE_TOKEN_BUDGET) -> str:
+    """Format retrieved nodes with their source and page, within ``token_budget``."""
+    passages = []
+    remaining = token_budget
+    for i, node_with_score in enumerate(nodes, 1):
+        node = node_with_score.node
+        metadata = node.metadata or {}
+        source = metadata.get("file_name", "knowledge base")
+        page = metadata.get("page_label")
+        header = f"[{i}] Source: {source}" + (f", page {page}" if page else "")
+        text = " ".join(node.get_content().split())
+
+        remaining -= _estimate_tokens(header)
+        if remaining <= 0:
+            break
+        if _estimate_tokens(text) > remaining:
+            text = text[: remaining * 4].rsplit(" ", 1)[0] + " ..."
+        remaining -= _estimate_tokens(text)
+        passages.append(f"{header}\n{text}")
+        if remaining <= 0:
+            break
+
+    if not passages:
+        return "No relevant information was found in the knowledge base."
+    return "\n\n".join(passages)
+
+
+async def livekit_retrieve(
+    query: str,
+    similarity_top_k: int = RETRIEVE_TOP_K,
+    token_budget: int = RETRIEVE_TOKEN_BUDGET,
+) -> str:
+    """Retrieval-only lookup: formatted top-k passages, no LLM synthesis."""
+    logger.info(f"Retrieving passages for {query}")
+    if index is None:
+        await asyncio.to_thread(load_index)
+    nodes = await get_retriever(similarity_top_k).aretrieve(query)
+    return format_passages(nodes, token_budget)
+
+
+async def livekit_rag(query: str, similarity_top_k: Optional[int] = None):
+    """Answer ``query`` from the knowledge base according to LIVEKIT_RAG_MODE.
+
+    "synthesize" (the default) runs a full query; in "retrieve" mode the
+    realtime model gets source passages and is the only model generating.
+    Repeated or near-identical questions are served from the answer cache.
+    """
+    if index is None:
+        await asyncio.to_thread(load_index)
+
+    async def _answer():
+        if RAG_MODE == "retrieve":
+            return await livekit_retrieve(query, similarity_top_k or RETRIEVE_TOP_K)
+        logger.info(f"Querying info for {query}")
+        query_engine = get_query_engine(similarity_top_k or DEFAULT_SIMILARITY_TOP_K)
+        res = await query_engine.aquery(query)
+        return str(res)
+
+    namespace = f"livekit:{RAG_MODE}:{similarity_top_k or 'default'}"
+    return await cached_answer(namespace, query, _answer, index_version)
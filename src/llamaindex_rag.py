@@ -1,16 +1,28 @@
 from pathlib import Path
 from dotenv import load_dotenv
 from llama_index.core import (
-    SimpleDirectoryReader,
     VectorStoreIndex,
-    StorageContext,
-    load_index_from_storage,
     Settings,
 )
-from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
 from llama_index.core.agent.workflow import FunctionAgent
+from llama_index.core.objects import ObjectIndex, ObjectRetriever
 from utils import get_doc_tools
+from rag_index import (
+    DATA_DIR,
+    PERSIST_DIR,
+    current_index_dir,
+    discard_index_version,
+    load_manifest,
+    publish_index_version,
+    read_index_version,
+    save_manifest,
+    stage_index_version,
+    sync_data_dir,
+)
+from index_pipeline import build_and_persist_index
+from vector_stores import load_persisted_index
+from rag_models import configure_models
+from typing import Optional
 import logging
 import os
 
@@ -21,25 +33,20 @@ load_dotenv(env_path)
 logger = logging.getLogger(__name__)
 
 # Configure LlamaIndex to use native Gemini models
-Settings.llm = GoogleGenAI(
-    model="gemini-2.0-flash",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.7,
-)
+configure_models(llm_model="gemini-2.0-flash", embedding_model="text-embedding-004")
 
-Settings.embed_model = GoogleGenAIEmbedding(
-    model="text-embedding-004",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-)
+# Configuration: DATA_DIR and PERSIST_DIR come from rag_index (RAG_DATA_DIR / RAG_PERSIST_DIR)
+# Above this many tools, route each agent step through a tool retriever
+TOOL_RETRIEVAL_THRESHOLD = int(os.getenv("RAG_TOOL_RETRIEVAL_THRESHOLD", "20"))
+TOOL_RETRIEVAL_TOP_K = int(os.getenv("RAG_TOOL_RETRIEVAL_TOP_K", "6"))
 
-# Configuration
-THIS_DIR = Path(__file__).parent
-DATA_DIR = THIS_DIR / "data"  # or "src/data" based on your structure
-PERSIST_DIR = THIS_DIR / "query-engine-storage"
+# Version directory the last setup_persistent_index() call loaded
+_loaded_dir: Optional[Path] = None
 
 
 def setup_persistent_index():
     """Set up or load the persistent vector index."""
+    global _loaded_dir
     if not PERSIST_DIR.exists():
         logger.info("Creating new vector index...")
 
@@ -48,40 +55,35 @@ def setup_persistent_index():
             logger.warning(
                 f"Data directory {DATA_DIR} does not exist. Creating empty index."
             )
-            # Create an empty index
-            index = VectorStoreIndex.from_documents([])
-            index.storage_context.persist(persist_dir=PERSIST_DIR)
-            logger.info(f"Empty index created and persisted to {PERSIST_DIR}")
-            return index
-
-        # Check if data directory is empty
-        data_files = list(DATA_DIR.iterdir())
-        if not data_files:
+        elif not list(DATA_DIR.iterdir()):
             logger.warning(f"Data directory {DATA_DIR} is empty. Creating empty index.")
-            # Create an empty index
-            index = VectorStoreIndex.from_documents([])
-            index.storage_context.persist(persist_dir=PERSIST_DIR)
-            logger.info(f"Empty index created and persisted to {PERSIST_DIR}")
-            return index
-
-        # Load documents and create index
-        documents = SimpleDirectoryReader(DATA_DIR).load_data()
-        index = VectorStoreIndex.from_documents(documents)
-        # Persist for later use
-        index.storage_context.persist(persist_dir=PERSIST_DIR)
+
+        # Load documents and embed them in concurrent batches; an empty or
+        # missing data directory yields an empty index
+        index = build_and_persist_index(DATA_DIR, PERSIST_DIR)
+        _loaded_dir = current_index_dir(PERSIST_DIR)
         logger.info(f"Index created and persisted to {PERSIST_DIR}")
     else:
         logger.info("Loading existing vector index...")
-        # Load existing index
-        storage_context = StorageContext.from_defaults(persist_dir=PERSIST_DIR)
-        index = load_index_from_storage(storage_context)
+        # Load existing index from the version it currently points to
+        _loaded_dir = current_index_dir(PERSIST_DIR)
+        index = load_persisted_index(_loaded_dir)
         logger.info("Index loaded successfully")
 
     return index
 
 
-def create_file_specific_tools():
-    """Create vector and summary tools for each file."""
+def loaded_index_version() -> int:
+    """Index version of the directory setup_persistent_index() loaded (0 if none)."""
+    return read_index_version(_loaded_dir) if _loaded_dir else 0
+
+
+def create_file_specific_tools(index=None):
+    """Create vector and summary tools for each file.
+
+    Passing the shared persistent index scopes each file's tools to it instead
+    of re-parsing and re-embedding the file into its own in-memory index.
+    """
     file_to_tools_dict = {}
 
     if not DATA_DIR.exists():
@@ -100,7 +102,7 @@ def create_file_specific_tools():
         if file.is_file():  # Only process files, not directories
             logger.info(f"Getting tools for file: {file}")
             try:
-                vector_tool, summary_tool = get_doc_tools(file, file.stem)
+                vector_tool, summary_tool = get_doc_tools(file, file.stem, index=index)
                 file_to_tools_dict[file] = [vector_tool, summary_tool]
             except Exception as e:
                 logger.error(f"Error creating tools for {file}: {e}")
@@ -111,7 +113,7 @@ def create_file_specific_tools():
     ]
 
     logger.info(
-        f"Created {len(initial_tools)} tools from {len(file_to_tools_dict)} files"
+        f"Registered {len(initial_tools)} lazy tools from {len(file_to_tools_dict)} files"
     )
     return file_to_tools_dict, initial_tools
 
@@ -132,6 +134,41 @@ def create_index_query_tool(index):
     return index_tool
 
 
+class PinnedToolRetriever(ObjectRetriever):
+    """Tool retriever that always returns ``pinned_tools`` ahead of the retrieved ones."""
+
+    def __init__(self, object_retriever: ObjectRetriever, pinned_tools):
+        super().__init__(
+            retriever=object_retriever.retriever,
+            object_node_mapping=object_retriever.object_node_mapping,
+            node_postprocessors=getattr(object_retriever, "_node_postprocessors", None),
+        )
+        self._pinned_tools = list(pinned_tools)
+
+    def _merge(self, tools):
+        pinned_names = {tool.metadata.name for tool in self._pinned_tools}
+        return self._pinned_tools + [
+            tool for tool in tools if tool.metadata.name not in pinned_names
+        ]
+
+    def retrieve(self, str_or_query_bundle):
+        return self._merge(super().retrieve(str_or_query_bundle))
+
+    async def aretrieve(self, str_or_query_bundle):
+        return self._merge(await super().aretrieve(str_or_query_bundle))
+
+
+def create_tool_retriever(file_specific_tools, pinned_tools, top_k=None):
+    """Index file tool descriptions so the agent only sees the top-k relevant ones.
+
+    Tool names and descriptions are embedded once (through the shared embedding
+    cache); ``pinned_tools`` such as query_all_documents are always included.
+    """
+    obj_index = ObjectIndex.from_objects(file_specific_tools, index_cls=VectorStoreIndex)
+    retriever = obj_index.as_retriever(similarity_top_k=top_k or TOOL_RETRIEVAL_TOP_K)
+    return PinnedToolRetriever(retriever, pinned_tools)
+
+
 def setup_combined_agent():
     """Set up the agent with both persistent index and file-specific tools (FunctionAgent)."""
 
@@ -139,7 +176,7 @@ def setup_combined_agent():
     index = setup_persistent_index()
 
     # Step 2: Create file-specific tools
-    file_to_tools_dict, file_specific_tools = create_file_specific_tools()
+    file_to_tools_dict, file_specific_tools = create_file_specific_tools(index)
 
     # Step 3: Create index query tool
     index_tool = create_index_query_tool(index)
@@ -167,52 +204,91 @@ def setup_combined_agent():
     Always cite which documents or sources your information comes from.
     """
 
-    # Step 7: Create Workflow Agent
-    workflow = FunctionAgent(
-        tools=all_tools,
-        llm=llm,
-        system_prompt=system_prompt,
-    )
-
-    logger.info(f"FunctionAgent created with {len(all_tools)} total tools")
+    # Step 7: Create Workflow Agent. With many files, only the most relevant
+    # file tools (plus the index tool) are sent to the LLM on each step.
+    if len(all_tools) > TOOL_RETRIEVAL_THRESHOLD:
+        workflow = FunctionAgent(
+            tool_retriever=create_tool_retriever(file_specific_tools, [index_tool]),
+            llm=llm,
+            system_prompt=system_prompt,
+        )
+        logger.info(
+            f"FunctionAgent created with {len(all_tools)} total tools "
+            f"(retrieving top {TOOL_RETRIEVAL_TOP_K} file tools per step)"
+        )
+    else:
+        workflow = FunctionAgent(
+            tools=all_tools,
+            llm=llm,
+            system_prompt=system_prompt,
+        )
+        logger.info(f"FunctionAgent created with {len(all_tools)} total tools")
 
     return workflow, index, file_to_tools_dict
 
 
 def update_index_with_new_documents():
-    """Update the persistent index when new documents are added."""
+    """Upsert new or changed documents into the persistent index.
+
+    Returns:
+        The updated index; use sync_index_with_data_dir() for the change report.
+    """
+    index, _ = sync_index_with_data_dir()
+    return index
+
+
+def sync_index_with_data_dir():
+    """Upsert new or changed documents into the persistent index.
+
+    Documents are keyed on stable IDs derived from their file name, so repeated
+    calls only embed what actually changed instead of re-inserting the corpus.
+
+    Returns:
+        Tuple of (index, report) where report holds inserted/updated/skipped/deleted
+        document counts.
+    """
     # Load existing index
-    storage_context = StorageContext.from_defaults(persist_dir=PERSIST_DIR)
-    index = load_index_from_storage(storage_context)
+    index = load_persisted_index(PERSIST_DIR)
+    report = {"inserted": 0, "updated": 0, "skipped": 0, "deleted": 0}
 
     # Check if data directory exists and has files
     if not DATA_DIR.exists():
         logger.warning(
             f"Data directory {DATA_DIR} does not exist. No documents to update."
         )
-        return index
+        return index, report
 
     # Check if data directory is empty
     data_files = list(DATA_DIR.iterdir())
     if not data_files:
         logger.warning(f"Data directory {DATA_DIR} is empty. No documents to update.")
-        return index
-
-    # Load new documents
-    documents = SimpleDirectoryReader(DATA_DIR).load_data()
-
-    # Add new documents to existing index
-    for doc in documents:
-        index.insert(doc)
-
-    # Persist updated index
-    index.storage_context.persist(persist_dir=PERSIST_DIR)
-
-    logger.info("Index updated with new documents")
-    return index
-
-
+        return index, report
+
+    # Upsert into a copy of the published index, then swap it in; without a
+    # manifest every file is treated as new and legacy documents are replaced
+    # through the docstore's ref_doc mapping
+    manifest = load_manifest(PERSIST_DIR)
+    manifest_files = manifest["files"] if manifest else {}
+    version_dir = stage_index_version(PERSIST_DIR, copy_current=True)
+    try:
+        staged_index = load_persisted_index(version_dir)
+        report = sync_data_dir(staged_index, DATA_DIR, manifest_files)
+        if report["inserted"] or report["updated"] or report["deleted"] or not manifest:
+            staged_index.storage_context.persist(persist_dir=version_dir)
+            save_manifest(version_dir, manifest_files)
+            publish_index_version(PERSIST_DIR, version_dir)
+            index = staged_index
+        else:
+            discard_index_version(version_dir)
+    except Exception:
+        discard_index_version(version_dir)
+        raise
 
+    logger.info(
+        f"Index updated: {report['inserted']} inserted, {report['updated']} updated, "
+        f"{report['skipped']} skipped, {report['deleted']} deleted"
+    )
+    return index, report
 
 
 # Main execution
@@ -231,7 +307,7 @@ if __name__ == "__main__":
     logger.info(f"File Tools: {file_tools}")
 
     logger.info("\nAgent is ready! Available tools:")
-    for tool in workflow_agent.tools:
+    for tool in workflow_agent.tools or []:
         logger.info(f"- {tool.metadata.name}: {tool.metadata.description}")
 
     # Example queries using the workflow agent (async)
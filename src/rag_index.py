@@ -0,0 +1,416 @@
+"""
+Shared helpers for managing the persisted RAG index.
+
+Tracks a manifest of per-file content hashes next to query-engine-storage so
+that rebuilds only parse and embed files that were added or changed, and
+removes nodes for files that were deleted.
+"""
+
+import ctypes
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from llama_index.core import Document, SimpleDirectoryReader
+from llama_index.core.schema import BaseNode
+
+logger = logging.getLogger("rag_index")
+
+# Data and published index locations, overridable for benchmarks and deployments
+SRC_DIR = Path(__file__).parent
+DATA_DIR = Path(os.getenv("RAG_DATA_DIR", str(SRC_DIR / "data")))
+PERSIST_DIR = Path(os.getenv("RAG_PERSIST_DIR", str(SRC_DIR / "query-engine-storage")))
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Published index versions kept on disk; older ones are removed on publish
+KEEP_INDEX_VERSIONS = int(os.getenv("RAG_KEEP_INDEX_VERSIONS", "3"))
+# ...but only once they were superseded this many seconds ago: readers load the
+# docstore and vectors lazily, and workers only notice a new version on their
+# next hot-reload check (every RAG_RELOAD_INTERVAL seconds)
+INDEX_VERSION_GRACE = float(
+    os.getenv(
+        "RAG_INDEX_VERSION_GRACE",
+        str(max(60.0, 2 * float(os.getenv("RAG_RELOAD_INTERVAL", "5")))),
+    )
+)
+
+# File-system metadata that changes without the content changing
+VOLATILE_METADATA_KEYS = (
+    "file_size",
+    "creation_date",
+    "last_modified_date",
+    "last_accessed_date",
+)
+
+
+def file_content_hash(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_data_files(data_dir: Path) -> List[Path]:
+    """List the indexable files in the data directory (non-recursive, no dotfiles)."""
+    if not data_dir.exists():
+        return []
+    return sorted(
+        f for f in data_dir.iterdir() if f.is_file() and not f.name.startswith(".")
+    )
+
+
+def scan_data_dir(data_dir: Path) -> Dict[str, str]:
+    """Map each file name in the data directory to its content hash."""
+    return {f.name: file_content_hash(f) for f in list_data_files(data_dir)}
+
+
+def load_manifest(persist_dir: Path) -> Optional[Dict[str, Any]]:
+    """Load the file manifest stored next to the index, or None if missing/invalid."""
+    manifest_path = persist_dir / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not read manifest at {manifest_path}: {e}")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.info("Manifest version mismatch, ignoring it")
+        return None
+    return manifest
+
+
+def save_manifest(persist_dir: Path, files: Dict[str, Dict[str, Any]]) -> None:
+    """Write the file manifest atomically next to the index.
+
+    Every save bumps ``index_version`` (a nanosecond timestamp, so versions are
+    ordered), which lets caches built on the index tell that it changed.
+    """
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = persist_dir / MANIFEST_FILENAME
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "index_version": time.time_ns(),
+        "files": files,
+    }
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path.replace(manifest_path)
+
+
+def read_index_version(persist_dir: Path) -> int:
+    """Return the index version recorded in the manifest (0 if unknown)."""
+    manifest = load_manifest(persist_dir)
+    if not manifest:
+        return 0
+    return int(manifest.get("index_version", 0))
+
+
+def versions_root(persist_dir: Path) -> Path:
+    """Directory holding the versioned index directories behind ``persist_dir``."""
+    return persist_dir.with_name(persist_dir.name + ".versions")
+
+
+def stage_index_version(persist_dir: Path, copy_current: bool = False) -> Path:
+    """Create a new, unpublished index version directory.
+
+    With ``copy_current`` the currently published index is copied into it, so
+    an incremental update can modify the copy while readers keep using the
+    published version.
+    """
+    version_dir = versions_root(persist_dir) / str(time.time_ns())
+    if copy_current and persist_dir.exists():
+        shutil.copytree(persist_dir.resolve(), version_dir)
+    else:
+        version_dir.mkdir(parents=True)
+    return version_dir
+
+
+def discard_index_version(version_dir: Path) -> None:
+    """Remove a staged version that will not be published."""
+    shutil.rmtree(version_dir, ignore_errors=True)
+
+
+def _exchange_paths(a: Path, b: Path) -> bool:
+    """Atomically swap two paths (Linux ``renameat2(RENAME_EXCHANGE)``).
+
+    Returns False where the call is unavailable.
+    """
+    renameat2 = getattr(ctypes.CDLL(None, use_errno=True), "renameat2", None)
+    if renameat2 is None:
+        return False
+    at_fdcwd, rename_exchange = -100, 2
+    if renameat2(at_fdcwd, os.fsencode(a), at_fdcwd, os.fsencode(b), rename_exchange) != 0:
+        err = ctypes.get_errno()
+        if err in (errno.ENOSYS, errno.EINVAL):
+            return False
+        raise OSError(err, os.strerror(err), str(b))
+    return True
+
+
+def publish_index_version(
+    persist_dir: Path,
+    version_dir: Path,
+    keep: int = KEEP_INDEX_VERSIONS,
+    grace_seconds: float = INDEX_VERSION_GRACE,
+) -> None:
+    """Atomically point ``persist_dir`` at ``version_dir``.
+
+    ``persist_dir`` is a symlink that is swapped with a rename, so readers see
+    either the old or the new index, never a partially written one. A legacy
+    plain directory is swapped out for the symlink in one step and moved into
+    the versions directory.
+    """
+    root = versions_root(persist_dir)
+    # the version's mtime records when it was published (see _prune_index_versions)
+    os.utime(version_dir)
+
+    tmp_link = persist_dir.with_name(f".{persist_dir.name}.{os.getpid()}.tmp")
+    if tmp_link.is_symlink():
+        tmp_link.unlink()
+    os.symlink(os.path.relpath(version_dir, persist_dir.parent), tmp_link)
+
+    if persist_dir.exists() and not persist_dir.is_symlink():
+        legacy_dir = root / f"{time.time_ns()}-legacy"
+        logger.info(f"Moving legacy index directory to {legacy_dir}")
+        if _exchange_paths(tmp_link, persist_dir):
+            # persist_dir is now the symlink and the legacy directory is at tmp_link
+            os.rename(tmp_link, legacy_dir)
+        else:
+            os.rename(persist_dir, legacy_dir)
+            os.replace(tmp_link, persist_dir)
+    else:
+        os.replace(tmp_link, persist_dir)
+    logger.info(f"Published index version {version_dir.name}")
+
+    _prune_index_versions(root, version_dir.resolve(), keep, grace_seconds)
+
+
+def _prune_index_versions(root: Path, current: Path, keep: int, grace_seconds: float) -> None:
+    """Remove versions beyond the newest ``keep`` that were superseded over
+    ``grace_seconds`` ago.
+
+    A version stops being served when the next one is published, which is
+    that version's mtime (set in publish_index_version).
+    """
+    versions = sorted((d for d in root.iterdir() if d.is_dir()), key=lambda d: d.name)
+    cutoff = time.time() - grace_seconds
+    for old_dir, newer_dir in zip(versions[: max(0, len(versions) - keep)], versions[1:]):
+        if old_dir.resolve() == current:
+            continue
+        try:
+            superseded_at = newer_dir.stat().st_mtime
+        except OSError:
+            continue
+        if superseded_at < cutoff:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def current_index_dir(persist_dir: Path) -> Optional[Path]:
+    """The directory ``persist_dir`` currently resolves to, or None if missing."""
+    return persist_dir.resolve() if persist_dir.exists() else None
+
+
+def diff_manifest(
+    old_files: Dict[str, Dict[str, Any]], current_hashes: Dict[str, str]
+) -> Tuple[List[str], List[str], List[str]]:
+    """Compare manifest entries with the current data directory.
+
+    Returns:
+        (added, changed, removed) lists of file names.
+    """
+    added = [name for name in current_hashes if name not in old_files]
+    changed = [
+        name
+        for name, file_hash in current_hashes.items()
+        if name in old_files and old_files[name].get("hash") != file_hash
+    ]
+    removed = [name for name in old_files if name not in current_hashes]
+    return added, changed, removed
+
+
+def load_file_documents(path: Path) -> List[Document]:
+    """Load a single file with stable, path-derived document IDs.
+
+    IDs are ``<file name>_part_<n>`` so re-loading the same file yields the same
+    IDs, which lets the index replace rather than duplicate its documents.
+    Volatile file-system metadata is dropped so that a document's hash only
+    changes when its content does.
+    """
+    documents = SimpleDirectoryReader(input_files=[path]).load_data()
+    for i, doc in enumerate(documents):
+        doc.id_ = f"{path.name}_part_{i}"
+        for key in VOLATILE_METADATA_KEYS:
+            doc.metadata.pop(key, None)
+    return documents
+
+
+def ref_doc_ids_for_file(docstore, file_name: str) -> List[str]:
+    """Find the ref doc IDs in a docstore that were loaded from ``file_name``."""
+    ref_doc_info = docstore.get_all_ref_doc_info() or {}
+    return [
+        ref_doc_id
+        for ref_doc_id, info in ref_doc_info.items()
+        if (info.metadata or {}).get("file_name") == file_name
+    ]
+
+
+def get_file_nodes(docstore, file_name: str) -> List[BaseNode]:
+    """Return the nodes a docstore holds for ``file_name``, in document order."""
+    nodes: List[BaseNode] = []
+    for ref_doc_id in sorted(ref_doc_ids_for_file(docstore, file_name), key=_part_number):
+        info = docstore.get_ref_doc_info(ref_doc_id)
+        if info and info.node_ids:
+            nodes.extend(docstore.get_nodes(info.node_ids))
+    return nodes
+
+
+def _part_number(doc_id: str):
+    """Sort key for ``<file name>_part_<n>`` IDs (other IDs sort after, by name)."""
+    _, sep, part = doc_id.rpartition("_part_")
+    return (0, int(part), doc_id) if sep and part.isdigit() else (1, 0, doc_id)
+
+
+def delete_file_nodes(index, file_name: str, known_doc_ids: Optional[List[str]] = None) -> int:
+    """Remove every node belonging to ``file_name`` from the index.
+
+    Uses the docstore's ref_doc mapping, plus any doc IDs recorded in the manifest.
+    Returns the number of ref docs deleted.
+    """
+    doc_ids = set(known_doc_ids or []) | set(ref_doc_ids_for_file(index.docstore, file_name))
+    for doc_id in doc_ids:
+        index.delete_ref_doc(doc_id, delete_from_docstore=True)
+    return len(doc_ids)
+
+
+def upsert_documents(
+    index,
+    documents: List[Document],
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+) -> Dict[str, int]:
+    """Insert or update documents by ID, ``refresh_ref_docs``-style.
+
+    Documents whose ID is unknown are inserted, those whose stored hash differs
+    are replaced, and identical ones are skipped without re-embedding. New and
+    changed documents are chunked together and embedded through the batched,
+    concurrent, retrying index_pipeline.aembed_nodes.
+    """
+    # index_pipeline imports this module
+    from index_pipeline import aembed_nodes, parse_nodes, run_sync
+
+    report = {"inserted": 0, "updated": 0, "skipped": 0}
+    to_embed: List[Document] = []
+    replaced: List[str] = []
+    for doc in documents:
+        existing_hash = index.docstore.get_document_hash(doc.id_)
+        if existing_hash is None:
+            report["inserted"] += 1
+        elif existing_hash != doc.hash:
+            replaced.append(doc.id_)
+            report["updated"] += 1
+        else:
+            report["skipped"] += 1
+            continue
+        to_embed.append(doc)
+    if not to_embed:
+        return report
+
+    nodes = parse_nodes(to_embed)
+    run_sync(aembed_nodes(nodes, progress_callback=progress_callback))
+    # only drop the old versions once the new ones are embedded
+    for doc_id in replaced:
+        index.delete_ref_doc(doc_id, delete_from_docstore=True)
+    index.insert_nodes(nodes)
+    for doc in to_embed:
+        index.docstore.set_document_hash(doc.id_, doc.hash)
+    return report
+
+
+def sync_data_dir(
+    index,
+    data_dir: Path,
+    manifest_files: Dict[str, Dict[str, Any]],
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    files_per_batch: Optional[int] = None,
+) -> Dict[str, int]:
+    """Bring ``index`` in line with ``data_dir``, updating ``manifest_files`` in place.
+
+    Unchanged files (same content hash as the manifest) are not even parsed.
+    Added/changed files are upserted document by document, ``files_per_batch``
+    files (default RAG_FILES_PER_BATCH) per embedding pass, and documents of
+    removed files, or parts a changed file no longer has, are deleted.
+
+    ``progress_callback(stage, done, total)`` is called after each batch of
+    files, and with embedding progress.
+
+    Returns:
+        Counts of inserted, updated, skipped and deleted documents.
+    """
+    from index_pipeline import FILES_PER_BATCH
+
+    files_per_batch = files_per_batch or FILES_PER_BATCH
+    current_hashes = scan_data_dir(data_dir)
+    added, changed, removed = diff_manifest(manifest_files, current_hashes)
+    logger.info(
+        f"Syncing index: {len(added)} added, {len(changed)} changed, "
+        f"{len(removed)} removed files"
+    )
+
+    report = {"inserted": 0, "updated": 0, "skipped": 0, "deleted": 0}
+
+    for name in removed:
+        entry = manifest_files.pop(name)
+        report["deleted"] += delete_file_nodes(index, name, entry.get("doc_ids"))
+
+    to_sync = added + changed
+    group: List[Tuple[str, List[Document]]] = []
+    files_done = 0
+
+    def _flush() -> None:
+        nonlocal files_done
+        counts = upsert_documents(
+            index, [doc for _, docs in group for doc in docs], progress_callback
+        )
+        for key, value in counts.items():
+            report[key] += value
+        for name, documents in group:
+            manifest_files[name] = {
+                "hash": current_hashes[name],
+                "doc_ids": [doc.id_ for doc in documents],
+            }
+        files_done += len(group)
+        group.clear()
+        if progress_callback:
+            progress_callback("files", files_done, len(to_sync))
+
+    for name in to_sync:
+        documents = load_file_documents(data_dir / name)
+        new_ids = {doc.id_ for doc in documents}
+        old_ids = set(manifest_files.get(name, {}).get("doc_ids", []))
+        old_ids |= set(ref_doc_ids_for_file(index.docstore, name))
+        for doc_id in old_ids - new_ids:
+            index.delete_ref_doc(doc_id, delete_from_docstore=True)
+            report["deleted"] += 1
+        group.append((name, documents))
+        if len(group) >= files_per_batch:
+            _flush()
+    if group:
+        _flush()
+
+    for name in current_hashes:
+        if name not in added and name not in changed:
+            report["skipped"] += len(manifest_files[name].get("doc_ids", []))
+
+    return report
@@ -0,0 +1,50 @@
+"""
+Model configuration shared by the RAG modules.
+
+Configures the LlamaIndex Settings with Gemini models. Offline tools such as
+the benchmarks register replacement models with ``use_models()`` before
+importing the RAG modules; there is deliberately no environment switch for it.
+"""
+
+import os
+from typing import Any, Optional
+
+from llama_index.core import Settings
+
+from embedding_cache import cached_embed_model
+
+# (llm, embed_model) registered through use_models(), used instead of Gemini
+_override: Optional[tuple] = None
+
+
+def use_models(llm: Any, embed_model: Any) -> None:
+    """Make every later configure_models() call install these models instead of Gemini."""
+    global _override
+    _override = (llm, embed_model)
+
+
+def configure_models(
+    llm_model: str = "gemini-2.0-flash",
+    embedding_model: str = "text-embedding-004",
+    temperature: float = 0.7,
+) -> None:
+    """Set Settings.llm and Settings.embed_model (wrapped in the embedding cache)."""
+    if _override is not None:
+        Settings.llm, embed_model = _override
+        Settings.embed_model = cached_embed_model(embed_model)
+        return
+
+    from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
+    from llama_index.llms.google_genai import GoogleGenAI
+
+    Settings.llm = GoogleGenAI(
+        model=llm_model,
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=temperature,
+    )
+    Settings.embed_model = cached_embed_model(
+        GoogleGenAIEmbedding(
+            model=embedding_model,
+            api_key=os.getenv("GOOGLE_API_KEY"),
+        )
+    )
@@ -1,56 +1,92 @@
 #!/usr/bin/env python3
 """
 Script to recreate RAG embeddings after file uploads.
-This script deletes the existing query-engine-storage and recreates it with new documents.
+This script updates query-engine-storage incrementally: only files that were added
+or changed since the last run are parsed and embedded, and nodes of deleted files
+are removed. Pass --full to rebuild from scratch.
+
+Run with --serve to keep a local indexing service running instead (see
+indexing_service.py); the upload route then submits jobs to it rather than
+starting a new Python process per upload.
+
+Each run writes a new index version and then atomically repoints the
+query-engine-storage symlink at it, so running agents can hot-reload it.
 """
 
-import shutil
 from dotenv import load_dotenv
-from llama_index.core import (
-    SimpleDirectoryReader,
-    VectorStoreIndex,
-    Settings,
-)
-from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
 from pathlib import Path
 import logging
 import os
+import sys
+
+from index_pipeline import build_index, log_progress
+from vector_stores import load_persisted_index, new_storage_context
+from rag_models import configure_models
+from rag_index import (
+    DATA_DIR,
+    PERSIST_DIR,
+    discard_index_version,
+    load_manifest,
+    publish_index_version,
+    save_manifest,
+    scan_data_dir,
+    stage_index_version,
+    sync_data_dir,
+)
 
 # Set up logging
 logger = logging.getLogger("recreate_rag")
 
-# Load environment variables from the correct path
-env_path = Path(__file__).parent.parent / ".env.local"
-load_dotenv(env_path)
+_configured = False
 
-# Configure LlamaIndex to use native Gemini models
-Settings.llm = GoogleGenAI(
-    model="models/gemini-1.5-flash",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.7,
-)
 
-Settings.embed_model = GoogleGenAIEmbedding(
-    model="models/text-embedding-004",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-)
+def configure():
+    """Load .env.local and configure the Gemini models and embedding cache, once.
 
-
-def recreate_rag_embeddings():
+    Not done at import time: index_pipeline's spawned workers re-import this
+    script as their __main__ and must not open clients or the cache.
+    """
+    global _configured
+    if _configured:
+        return
+    # Load environment variables from the correct path
+    env_path = Path(__file__).parent.parent / ".env.local"
+    load_dotenv(env_path)
+
+    # Configure LlamaIndex to use native Gemini models
+    configure_models(
+        llm_model="models/gemini-1.5-flash", embedding_model="models/text-embedding-004"
+    )
+    _configured = True
+
+
+def _build_full_index(data_dir, persist_dir, current_hashes, progress_callback=None):
+    """Embed every file in the data directory into the empty ``persist_dir``."""
+    logger.info("Creating vector index through the batched embedding pipeline...")
+    index, manifest_files = build_index(
+        data_dir,
+        file_hashes=current_hashes,
+        storage_context=new_storage_context(persist_dir=persist_dir),
+        progress_callback=progress_callback or log_progress,
+    )
+    logger.info(f"Vector index created successfully from {len(manifest_files)} files")
+    return index, manifest_files
+
+
+def recreate_rag_embeddings(full_rebuild: bool = False, progress_callback=None):
     """
-    Delete existing query-engine-storage and recreate RAG embeddings from data folder.
+    Bring query-engine-storage up to date with the data folder.
+
+    Only added or changed files are re-embedded; a full rebuild happens when
+    requested, or when no usable index/manifest exists yet.
+    ``progress_callback(stage, done, total)`` receives build progress.
     """
     try:
+        configure()
         logger.info("=== RAG RECREATION FUNCTION CALLED ===")
         logger.info("Starting RAG recreation process...")
 
-        # Define paths
-        THIS_DIR = Path(__file__).parent
-        PERSIST_DIR = THIS_DIR / "query-engine-storage"
-        DATA_DIR = THIS_DIR / "data"
-
-        logger.info(f"Working directory: {THIS_DIR}")
+        logger.info(f"Working directory: {Path(__file__).parent}")
         logger.info(f"Data directory: {DATA_DIR}")
         logger.info(f"Storage directory: {PERSIST_DIR}")
 
@@ -59,35 +95,45 @@ def recreate_rag_embeddings():
             logger.warning(f"Data directory {DATA_DIR} does not exist!")
             return False
 
-        data_files = list(DATA_DIR.glob("*"))
-        logger.info(f"Found {len(data_files)} files in data directory")
-        for file in data_files:
-            logger.info(f"  - {file.name}")
-
-        # Delete existing query-engine-storage directory
-        if PERSIST_DIR.exists():
-            logger.info(f"Deleting existing storage at {PERSIST_DIR}")
-            shutil.rmtree(PERSIST_DIR)
-            logger.info("Existing storage deleted successfully")
-        else:
-            logger.info("No existing storage found, creating new one")
-
-        # Create storage directory if it doesn't exist
-        PERSIST_DIR.mkdir(exist_ok=True)
-        logger.info(f"Storage directory ready: {PERSIST_DIR}")
-
-        # load the documents and create the index
-        logger.info("Loading documents from data directory...")
-        documents = SimpleDirectoryReader(DATA_DIR).load_data()
-        logger.info(f"Loaded {len(documents)} documents")
-
-        logger.info("Creating vector index...")
-        index = VectorStoreIndex.from_documents(documents)
-        logger.info("Vector index created successfully")
-
-        # store it for later
-        logger.info("Persisting index to storage...")
-        index.storage_context.persist(persist_dir=PERSIST_DIR)
+        current_hashes = scan_data_dir(DATA_DIR)
+        logger.info(f"Found {len(current_hashes)} files in data directory")
+        for name in current_hashes:
+            logger.info(f"  - {name}")
+
+        manifest = None if full_rebuild else load_manifest(PERSIST_DIR)
+
+        # Work on a new version directory; the published index stays untouched
+        version_dir = stage_index_version(PERSIST_DIR, copy_current=manifest is not None)
+        logger.info(f"Staging index version in {version_dir}")
+        try:
+            if manifest is None:
+                logger.info("Performing full rebuild")
+                index, manifest_files = _build_full_index(
+                    DATA_DIR, version_dir, current_hashes, progress_callback
+                )
+            else:
+                logger.info("Loading existing index for incremental update...")
+                index = load_persisted_index(version_dir)
+                manifest_files = manifest["files"]
+                report = sync_data_dir(
+                    index, DATA_DIR, manifest_files, progress_callback=progress_callback
+                )
+                logger.info(f"Incremental update report: {report}")
+                if not (report["inserted"] or report["updated"] or report["deleted"]):
+                    logger.info("Index already up to date, nothing to persist")
+                    discard_index_version(version_dir)
+                    logger.info("=== RAG RECREATION COMPLETED SUCCESSFULLY ===")
+                    return True
+
+            # store it for later
+            logger.info("Persisting index to storage...")
+            index.storage_context.persist(persist_dir=version_dir)
+            save_manifest(version_dir, manifest_files)
+        except Exception:
+            discard_index_version(version_dir)
+            raise
+
+        publish_index_version(PERSIST_DIR, version_dir)
         logger.info("Index persisted successfully")
 
         logger.info("=== RAG RECREATION COMPLETED SUCCESSFULLY ===")
@@ -103,8 +149,20 @@ def recreate_rag_embeddings():
 
 
 if __name__ == "__main__":
+    configure()
+    if "--serve" in sys.argv[1:]:
+        from indexing_service import serve
+
+        logging.basicConfig(level=logging.INFO)
+        serve(
+            lambda full_rebuild, progress: recreate_rag_embeddings(
+                full_rebuild=full_rebuild, progress_callback=progress
+            )
+        )
+        sys.exit(0)
+
     print("=== RECREATE RAG SCRIPT STARTED ===")
-    success = recreate_rag_embeddings()
+    success = recreate_rag_embeddings(full_rebuild="--full" in sys.argv[1:])
     if success:
         print("=== SCRIPT COMPLETED SUCCESSFULLY ===")
     else:
@@ -0,0 +1,162 @@
+"""
+Per-user cache for session-start data.
+
+Users reconnect often (network blips, tab reloads), and every join used to
+re-fetch the same user context and BYOK key from Supabase. Agent jobs reuse
+their worker process, so these are cached in-process, keyed by user_id, with a
+TTL and LRU eviction. Concurrent joins for the same user share one in-flight
+load, and tools that write user data invalidate the cached context.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("user_cache")
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "256"))
+USER_CACHE_DISABLED = os.getenv("USER_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+# BYOK keys are saved and revoked by the web app, which cannot reach this
+# cache, so a rotated or revoked key must age out quickly
+USER_KEY_CACHE_TTL = float(os.getenv("USER_KEY_CACHE_TTL", "60"))
+
+
+class AsyncTTLCache:
+    """Async TTL + LRU cache with single-flight loading.
+
+    Failed loads are not cached, and a load that was in flight when its key
+    was invalidated is handed to its waiters but not stored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float = USER_CACHE_TTL,
+        max_entries: int = USER_CACHE_MAX_ENTRIES,
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires_at, value), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key``, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop ``key`` and make any in-flight load for it skip the cache."""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        for key in list(self._entries) + list(self._inflight):
+            self.invalidate(key)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Return the cached value for ``key``, loading it once if missing.
+
+        Concurrent callers for the same key await the same load. ``cache_if``
+        can reject values that should not be kept (e.g. degraded results).
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        generation = self._generations.get(key, 0)
+        # A task of its own, so a caller that gives up doesn't cancel the
+        # load other joins are waiting on
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Future) -> None:
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            if t.cancelled() or t.exception() is not None:
+                return
+            value = t.result()
+            if (
+                value is not None
+                and self._generations.get(key, 0) == generation
+                and (cache_if is None or cache_if(value))
+            ):
+                self.set(key, value)
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit rate and size for this process."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+
+# Process-wide caches, shared by every job the worker process runs
+user_context_cache = AsyncTTLCache("user_context")
+user_key_cache = AsyncTTLCache("user_key", ttl_seconds=USER_KEY_CACHE_TTL)
+
+
+async def cached_load(
+    cache: AsyncTTLCache,
+    user_id: str,
+    loader: Callable[[], Awaitable[Any]],
+    cache_if: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """Load through ``cache`` unless caching is disabled (USER_CACHE_DISABLED=1)."""
+    if USER_CACHE_DISABLED:
+        return await loader()
+    return await cache.get_or_load(user_id, loader, cache_if)
+
+
+def invalidate_user(user_id: Optional[str]) -> None:
+    """Forget cached context for ``user_id`` after writing their data."""
+    if user_id:
+        user_context_cache.invalidate(user_id)
+        logger.debug(f"Invalidated cached context for user {user_id[:8]}...")
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {cache.name: cache.stats() for cache in (user_context_cache, user_key_cache)}
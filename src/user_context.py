@@ -5,27 +5,23 @@ Handles fetching user profiles, conversation history, and wellness metrics
 to provide personalized context to the voice AI agent.
 """
 
-import os
+import asyncio
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger("user_context")
 
-# Initialize Supabase Client
-supabase = None
-try:
-    from supabase import create_client, Client
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_SERVICE_KEY") or os.environ.get("SUPABASE_KEY")
-    
-    if supabase_url and supabase_key:
-        supabase: Client = create_client(supabase_url, supabase_key)
-        logger.info("✅ UserContextManager connected to Supabase")
-    else:
-        logger.warning("⚠️ Supabase credentials missing for UserContextManager")
-except Exception as e:
-    logger.error(f"❌ UserContextManager Supabase connection failed: {e}")
+# Shared Supabase client (see db.py); queries run off the event loop via execute()
+from db import execute, get_supabase
+supabase = get_supabase()
+
+# Worker-level cache of the rows below, so reconnecting users skip the fan-out
+from user_cache import cached_load, invalidate_user, user_context_cache
+
+# Per-query timeout for the session-start context fan-out
+CONTEXT_QUERY_TIMEOUT = float(os.getenv("USER_CONTEXT_QUERY_TIMEOUT", "2"))
 
 
 class UserContextManager:
@@ -54,62 +50,71 @@ class UserContextManager:
             logger.info(f"User ID '{user_id}' is not a valid UUID, using minimal context")
             return self._get_minimal_context()
         
-        try:
-            # Fetch user profile
-            profile_response = supabase.table('profiles').select(
+        rows = await cached_load(
+            user_context_cache,
+            user_id,
+            lambda: self._fetch_rows(user_id),
+            # don't keep a context that is missing a failed or timed-out query
+            cache_if=lambda rows: None not in rows.values(),
+        )
+
+        # Failed or timed-out queries leave their part of the context at defaults
+        self.profile = rows["profiles"] or {}
+        self.wellness_metrics = rows["wellness_metrics"][0] if rows["wellness_metrics"] else {}
+        # Transform to expected format
+        self.conversation_history = [
+            {
+                'mood_score': (s.get('metadata') or {}).get('analysis', {}).get('sentimentScore', 5),
+                'conversation_summary': s.get('title', ''),
+                'insights': (s.get('metadata') or {}).get('analysis', {}).get('keyInsights', []),
+                'created_at': s.get('created_at')
+            }
+            for s in rows["chat_sessions"] or []
+        ]
+        self.recent_tasks = rows["fun_tasks"] or []
+        self.achievements = rows["achievements"] or []
+
+        logger.info(f"✅ Loaded context for user {user_id[:8]}...")
+        return self._build_context()
+
+    async def _fetch_rows(self, user_id: str) -> Dict[str, Any]:
+        """Fetch the context rows for ``user_id``; a query that fails maps to None."""
+        names = ["profiles", "wellness_metrics", "chat_sessions", "fun_tasks", "achievements"]
+        # Fan the five queries out concurrently: session start waits for the
+        # slowest query instead of the sum of all round-trips
+        results = await asyncio.gather(
+            self._fetch("profiles", supabase.table('profiles').select(
                 'full_name, email, mental_health_goals, current_challenges, preferred_therapy_type'
-            ).eq('id', user_id).single().execute()
-            
-            if profile_response.data:
-                self.profile = profile_response.data
-            
-            # Fetch latest wellness metrics
-            metrics_response = supabase.table('wellness_metrics').select(
+            ).eq('id', user_id).single()),
+            # latest wellness metrics
+            self._fetch("wellness_metrics", supabase.table('wellness_metrics').select(
                 'mental_health_score, productivity_score, streak_days, goals_achieved, sessions_completed'
-            ).eq('user_id', user_id).order('recorded_at', desc=True).limit(1).execute()
-            
-            if metrics_response.data:
-                self.wellness_metrics = metrics_response.data[0]
-            
-            # Fetch recent conversation summaries (last 5 sessions) from chat_sessions
-            convo_response = supabase.table('chat_sessions').select(
+            ).eq('user_id', user_id).order('recorded_at', desc=True).limit(1)),
+            # recent conversation summaries (last 5 sessions) from chat_sessions
+            self._fetch("chat_sessions", supabase.table('chat_sessions').select(
                 'title, duration_seconds, metadata, created_at'
-            ).eq('user_id', user_id).order('created_at', desc=True).limit(5).execute()
-            
-            if convo_response.data:
-                # Transform to expected format
-                self.conversation_history = [
-                    {
-                        'mood_score': (s.get('metadata') or {}).get('analysis', {}).get('sentimentScore', 5),
-                        'conversation_summary': s.get('title', ''),
-                        'insights': (s.get('metadata') or {}).get('analysis', {}).get('keyInsights', []),
-                        'created_at': s.get('created_at')
-                    }
-                    for s in convo_response.data
-                ]
-            
-            # Fetch incomplete fun tasks
-            tasks_response = supabase.table('fun_tasks').select(
+            ).eq('user_id', user_id).order('created_at', desc=True).limit(5)),
+            # incomplete fun tasks
+            self._fetch("fun_tasks", supabase.table('fun_tasks').select(
                 'task_type, task_name, description, completed'
-            ).eq('user_id', user_id).eq('completed', False).limit(5).execute()
-            
-            if tasks_response.data:
-                self.recent_tasks = tasks_response.data
-            
-            # Fetch recent achievements
-            achievements_response = supabase.table('achievements').select(
+            ).eq('user_id', user_id).eq('completed', False).limit(5)),
+            # recent achievements
+            self._fetch("achievements", supabase.table('achievements').select(
                 'achievement_type, achievement_name, earned_at'
-            ).eq('user_id', user_id).order('earned_at', desc=True).limit(3).execute()
-            
-            if achievements_response.data:
-                self.achievements = achievements_response.data
-            
-            logger.info(f"✅ Loaded context for user {user_id[:8]}...")
-            return self._build_context()
-            
+            ).eq('user_id', user_id).order('earned_at', desc=True).limit(3)),
+        )
+        return dict(zip(names, results))
+
+    async def _fetch(self, name: str, query) -> Optional[Any]:
+        """Run one context query with its own timeout; None if it fails or times out."""
+        try:
+            response = await execute(query, timeout=CONTEXT_QUERY_TIMEOUT)
+            return response.data
+        except asyncio.TimeoutError:
+            logger.warning(f"Context query '{name}' timed out after {CONTEXT_QUERY_TIMEOUT}s")
         except Exception as e:
-            logger.error(f"Error loading user context: {e}")
-            return self._get_minimal_context()
+            logger.warning(f"Context query '{name}' failed: {e}")
+        return None
     
     def _build_context(self) -> Dict[str, Any]:
         """Build comprehensive context dictionary."""
@@ -209,10 +214,11 @@ Remember: You have tools to update their scores, assign tasks, and connect them
                 current_score = self.wellness_metrics.get("mental_health_score", 50)
                 new_score = min(100, current_score + 2)
                 
-                supabase.table('wellness_metrics').update({
+                await execute(supabase.table('wellness_metrics').update({
                     "mental_health_score": new_score,
                     "sessions_completed": self.wellness_metrics.get("sessions_completed", 0) + 1
-                }).eq('user_id', self.user_id).execute()
+                }).eq('user_id', self.user_id))
+                invalidate_user(self.user_id)
             
             logger.info(f"✅ Saved conversation summary for user {self.user_id[:8]}...")
             return True
@@ -232,9 +238,9 @@ Remember: You have tools to update their scores, assign tasks, and connect them
         
         try:
             # Get current metrics
-            response = supabase.table('wellness_metrics').select('*').eq(
+            response = await execute(supabase.table('wellness_metrics').select('*').eq(
                 'user_id', self.user_id
-            ).order('recorded_at', desc=True).limit(1).single().execute()
+            ).order('recorded_at', desc=True).limit(1).single())
             
             if not response.data:
                 return {"success": False, "message": "No metrics found"}
@@ -243,16 +249,17 @@ Remember: You have tools to update their scores, assign tasks, and connect them
             
             if score_type == "mental_health":
                 new_score = max(0, min(100, current.get("mental_health_score", 50) + change))
-                supabase.table('wellness_metrics').update({
+                await execute(supabase.table('wellness_metrics').update({
                     "mental_health_score": new_score
-                }).eq('id', current['id']).execute()
+                }).eq('id', current['id']))
             elif score_type == "productivity":
                 new_score = max(0, min(100, current.get("productivity_score", 50) + change))
-                supabase.table('wellness_metrics').update({
+                await execute(supabase.table('wellness_metrics').update({
                     "productivity_score": new_score
-                }).eq('id', current['id']).execute()
+                }).eq('id', current['id']))
             else:
                 return {"success": False, "message": "Invalid score type"}
+            invalidate_user(self.user_id)
             
             return {
                 "success": True,
@@ -1,23 +1,204 @@
 # TODO: abstract all of this into a function that takes in a PDF file name
 
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, SummaryIndex
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from llama_index.core import (
+    StorageContext,
+    SummaryIndex,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core.tools import FunctionTool, QueryEngineTool
-from llama_index.core.vector_stores import MetadataFilters, FilterCondition
+from llama_index.core.tools import FunctionTool
+from llama_index.core.vector_stores import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
 from typing import List, Optional
 
+from index_pipeline import parse_nodes
+from rag_index import file_content_hash, get_file_nodes, load_file_documents
+
+logger = logging.getLogger("utils")
+
+# Per-file indexes, one subdirectory per file content hash
+FILE_INDEX_DIR = Path(
+    os.getenv("RAG_FILE_INDEX_DIR", str(Path(__file__).parent / "file-index-storage"))
+)
+# Records which data file a per-file index directory was built from
+SOURCE_FILENAME = "source.json"
+# Builds persist to "<FILE_INDEX_DIR>/.tmp-*" first; leftovers from crashed
+# builds older than this are removed
+TMP_PREFIX = ".tmp-"
+STALE_TMP_SECONDS = 60 * 60
+
+
+class FileIndexes:
+    """Vector and summary indexes for a single data file, loaded on first use.
+
+    If the shared persisted index already contains the file, its nodes are reused
+    and vector queries are scoped with a ``file_name`` filter. Otherwise the
+    file's own indexes are loaded from ``FILE_INDEX_DIR/<content hash>``, and
+    only built (and persisted there) when that directory does not exist yet.
+    """
+
+    def __init__(
+        self,
+        file_path,
+        index: Optional[VectorStoreIndex] = None,
+        storage_root: Path = FILE_INDEX_DIR,
+    ):
+        self.file_path = Path(file_path)
+        self.shared_index = index
+        self.storage_root = storage_root
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._vector_index = None
+        self._summary_engine = None
+        self._base_filters: List[MetadataFilter] = []
+
+    @property
+    def loaded(self) -> bool:
+        return self._vector_index is not None
+
+    def load(self):
+        """Return ``(vector_index, summary_query_engine, base_filters)``, loading once."""
+        with self._lock:
+            if self._vector_index is None:
+                self._load()
+        return self._vector_index, self._summary_engine, self._base_filters
+
+    async def aload(self):
+        """Async variant of load: builds in a worker thread, at most once per tool.
+
+        Concurrent callers wait on the same per-file lock instead of each
+        starting their own build, and the event loop is never blocked.
+        """
+        if not self.loaded:
+            if self._async_lock is None:
+                self._async_lock = asyncio.Lock()
+            async with self._async_lock:
+                if not self.loaded:
+                    await asyncio.to_thread(self.load)
+        return self._vector_index, self._summary_engine, self._base_filters
+
+    def _load(self) -> None:
+        file_name = self.file_path.name
+        nodes = []
+        if self.shared_index is not None:
+            nodes = get_file_nodes(self.shared_index.docstore, file_name)
+
+        if nodes:
+            vector_index = self.shared_index
+            summary_index = SummaryIndex(nodes)
+            self._base_filters = [MetadataFilter(key="file_name", value=file_name)]
+        else:
+            vector_index, summary_index = self._load_persisted()
+
+        self._summary_engine = summary_index.as_query_engine(
+            response_mode="tree_summarize",
+            use_async=True,
+        )
+        self._vector_index = vector_index
+
+    def _load_persisted(self):
+        persist_dir = self.storage_root / file_content_hash(self.file_path)
+        if persist_dir.exists():
+            logger.info(f"Loading indexes for {self.file_path.name} from {persist_dir}")
+            storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+            vector_index = load_index_from_storage(storage_context, index_id="vector")
+            summary_index = load_index_from_storage(storage_context, index_id="summary")
+            return vector_index, summary_index
+
+        logger.info(f"Building indexes for {self.file_path.name}")
+        # Chunk in-process: this runs on the first tool call of a voice session,
+        # where spawning parse workers costs far more than chunking one file
+        documents = load_file_documents(self.file_path)
+        nodes = parse_nodes(documents, [SentenceSplitter(chunk_size=1024)], workers=1)
+
+        # Both indexes share one docstore so the nodes are stored once
+        storage_context = StorageContext.from_defaults()
+        vector_index = VectorStoreIndex(nodes, storage_context=storage_context)
+        vector_index.set_index_id("vector")
+        summary_index = SummaryIndex(nodes, storage_context=storage_context)
+        summary_index.set_index_id("summary")
+
+        # Persist to a private temp dir first so a crash never leaves a partial
+        # index behind and concurrent builders of the same file don't collide
+        self.storage_root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=TMP_PREFIX, dir=self.storage_root))
+        storage_context.persist(persist_dir=tmp_dir)
+        with open(tmp_dir / SOURCE_FILENAME, "w", encoding="utf-8") as f:
+            json.dump({"file_name": self.file_path.name}, f)
+        try:
+            tmp_dir.rename(persist_dir)
+        except OSError:
+            # another process persisted the same content first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._prune_stale(persist_dir)
+        return vector_index, summary_index
+
+    def _prune_stale(self, current_dir: Path) -> None:
+        """Remove this file's indexes for older contents, and abandoned temp dirs."""
+        cutoff = time.time() - STALE_TMP_SECONDS
+        for entry in self.storage_root.iterdir():
+            if entry == current_dir or not entry.is_dir():
+                continue
+            try:
+                if entry.name.startswith(TMP_PREFIX):
+                    if entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry, ignore_errors=True)
+                    continue
+                with open(entry / SOURCE_FILENAME, "r", encoding="utf-8") as f:
+                    source = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if source.get("file_name") == self.file_path.name:
+                logger.info(f"Removing stale indexes for {self.file_path.name} at {entry}")
+                shutil.rmtree(entry, ignore_errors=True)
+
 
 def get_doc_tools(
     file_path: str,
     name: str,
+    index: Optional[VectorStoreIndex] = None,
 ) -> str:
-    """Get vector query and summary query tools from a document."""
+    """Get vector query and summary query tools from a document.
+
+    Creating the tools is cheap: only their names, descriptions and schemas are
+    registered, and the file's indexes are loaded (see FileIndexes) the first
+    time either tool is invoked.
+    """
+
+    indexes = FileIndexes(file_path, index=index)
 
-    # load documents
-    documents = SimpleDirectoryReader(input_files=[file_path]).load_data()
-    splitter = SentenceSplitter(chunk_size=1024)
-    nodes = splitter.get_nodes_from_documents(documents)
-    vector_index = VectorStoreIndex(nodes)
+    def _vector_query_engine(vector_index, base_filters, page_numbers):
+        filters = list(base_filters)
+        if page_numbers:
+            filters.append(
+                MetadataFilter(
+                    key="page_label", value=page_numbers, operator=FilterOperator.IN
+                )
+            )
+
+        return vector_index.as_query_engine(
+            similarity_top_k=2,
+            filters=(
+                MetadataFilters(filters=filters, condition=FilterCondition.AND)
+                if filters
+                else None
+            ),
+        )
 
     def vector_query(query: str, page_numbers: Optional[List[str]] = None) -> str:
         """Use to answer questions over a given paper.
@@ -33,18 +214,30 @@ def get_doc_tools(
 
         """
 
-        page_numbers = page_numbers or []
-        metadata_dicts = [{"key": "page_label", "value": p} for p in page_numbers]
-
-        query_engine = vector_index.as_query_engine(
-            similarity_top_k=2,
-            filters=MetadataFilters.from_dicts(
-                metadata_dicts, condition=FilterCondition.OR
-            ),
-        )
+        vector_index, _, base_filters = indexes.load()
+        query_engine = _vector_query_engine(vector_index, base_filters, page_numbers)
         response = query_engine.query(query)
         return response
 
+    async def avector_query(
+        query: str, page_numbers: Optional[List[str]] = None
+    ) -> str:
+        """Async variant of vector_query."""
+        vector_index, _, base_filters = await indexes.aload()
+        query_engine = _vector_query_engine(vector_index, base_filters, page_numbers)
+        response = await query_engine.aquery(query)
+        return response
+
+    def summary_query(query: str) -> str:
+        """Summarize the document to answer the query."""
+        _, summary_engine, _ = indexes.load()
+        return str(summary_engine.query(query))
+
+    async def asummary_query(query: str) -> str:
+        """Async variant of summary_query."""
+        _, summary_engine, _ = await indexes.aload()
+        return str(await summary_engine.aquery(query))
+
     # Create a shorter, sanitized name for the tool
     # Remove special characters and limit length to ensure it fits within 64 chars
     sanitized_name = "".join(c for c in name if c.isalnum() or c in (" ", "-", "_"))[
@@ -52,18 +245,21 @@ def get_doc_tools(
     ]
     sanitized_name = sanitized_name.replace(" ", "_").lower()
 
+    # Name the file in the description so tool retrieval can tell the tools apart
     vector_query_tool = FunctionTool.from_defaults(
-        name=f"vector_{sanitized_name}", fn=vector_query
+        name=f"vector_{sanitized_name}",
+        fn=vector_query,
+        async_fn=avector_query,
+        description=(
+            f"Useful for specific questions over {name}. Always leave page_numbers "
+            "as None UNLESS there is a specific page you want to search for."
+        ),
     )
 
-    summary_index = SummaryIndex(nodes)
-    summary_query_engine = summary_index.as_query_engine(
-        response_mode="tree_summarize",
-        use_async=True,
-    )
-    summary_tool = QueryEngineTool.from_defaults(
+    summary_tool = FunctionTool.from_defaults(
         name=f"summary_{sanitized_name}",
-        query_engine=summary_query_engine,
+        fn=summary_query,
+        async_fn=asummary_query,
         description=(f"Useful for summarization questions related to {name}"),
     )
 
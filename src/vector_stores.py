@@ -0,0 +1,734 @@
+"""
+Pluggable vector store backends for the persisted RAG index.
+
+The backend used for new indexes is selected with the RAG_VECTOR_STORE
+environment variable:
+
+- ``simple`` (default): LlamaIndex's SimpleVectorStore JSON file.
+- ``numpy``: exact search over one contiguous float32 matrix, a drop-in for
+  mid-size corpora where the default store's pure-Python cosine loop is the
+  hot path.
+- ``hnsw``: a local on-disk HNSW approximate nearest neighbour index (needs the
+  optional ``hnswlib`` package), so load time and query latency stay flat as the
+  corpus grows past tens of thousands of chunks.
+
+RAG_STORAGE_FORMAT=binary persists the index without large JSON files: vectors
+go to a raw float32 ``.npy`` file that is memory-mapped at load time, and the
+docstore/index store live in a SQLite database read on demand. The numpy and
+hnsw stores keep node ids and metadata in a SQLite node table, also read on
+demand.
+
+Existing indexes are always loaded with the backend and format they were built
+with.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+from typing import Any, Callable, ClassVar, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.index_store.keyval_index_store import KVIndexStore
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+from sqlite_kvstore import SQLiteKVStore
+
+logger = logging.getLogger("vector_stores")
+
+SIMPLE_BACKEND = "simple"
+HNSW_BACKEND = "hnsw"
+NUMPY_BACKEND = "numpy"
+VECTOR_STORE_BACKEND = os.getenv("RAG_VECTOR_STORE", SIMPLE_BACKEND).lower()
+
+JSON_FORMAT = "json"
+BINARY_FORMAT = "binary"
+STORAGE_FORMAT = os.getenv("RAG_STORAGE_FORMAT", JSON_FORMAT).lower()
+NODE_DB_FILENAME = "nodes.sqlite3"
+# Per vector store: node id, ref doc id and metadata for each row / label
+NODE_TABLE_FILENAME = "node_table.sqlite3"
+
+
+# ========== Metadata filtering ==========
+
+def _match_filter(value: Any, metadata_filter: MetadataFilter) -> bool:
+    """Evaluate a single metadata filter against a metadata value."""
+    op = metadata_filter.operator
+    expected = metadata_filter.value
+    if op == FilterOperator.IS_EMPTY:
+        return value is None or value == [] or value == ""
+    if value is None:
+        return op in (FilterOperator.NE, FilterOperator.NIN)
+    if op == FilterOperator.EQ:
+        return value == expected
+    if op == FilterOperator.NE:
+        return value != expected
+    if op == FilterOperator.IN:
+        return value in expected
+    if op == FilterOperator.NIN:
+        return value not in expected
+    if op == FilterOperator.GT:
+        return value > expected
+    if op == FilterOperator.GTE:
+        return value >= expected
+    if op == FilterOperator.LT:
+        return value < expected
+    if op == FilterOperator.LTE:
+        return value <= expected
+    if op == FilterOperator.CONTAINS:
+        return isinstance(value, (list, tuple)) and expected in value
+    if op == FilterOperator.ANY:
+        return isinstance(value, (list, tuple)) and any(v in value for v in expected)
+    if op == FilterOperator.ALL:
+        return isinstance(value, (list, tuple)) and all(v in value for v in expected)
+    if op == FilterOperator.TEXT_MATCH:
+        return isinstance(value, str) and str(expected) in value
+    raise ValueError(f"Unsupported metadata filter operator: {op}")
+
+
+def metadata_matches(metadata: Dict[str, Any], filters: Optional[MetadataFilters]) -> bool:
+    """Whether ``metadata`` satisfies ``filters`` (nested filters supported)."""
+    if filters is None or not filters.filters:
+        return True
+    results = (
+        metadata_matches(metadata, f)
+        if isinstance(f, MetadataFilters)
+        else _match_filter(metadata.get(f.key), f)
+        for f in filters.filters
+    )
+    if filters.condition == FilterCondition.OR:
+        return any(results)
+    return all(results)
+
+
+def query_filter_fn(
+    query: VectorStoreQuery,
+    metadata_lookup: Callable[[str], Dict[str, Any]],
+    ref_doc_lookup: Callable[[str], Optional[str]],
+) -> Optional[Callable[[str], bool]]:
+    """Build a node-id predicate from a query's filters / doc_ids / node_ids, or None."""
+    if not query.filters and not query.doc_ids and not query.node_ids:
+        return None
+    doc_ids = set(query.doc_ids or [])
+    node_ids = set(query.node_ids or [])
+
+    def _fn(node_id: str) -> bool:
+        if node_ids and node_id not in node_ids:
+            return False
+        if doc_ids and ref_doc_lookup(node_id) not in doc_ids:
+            return False
+        return metadata_matches(metadata_lookup(node_id), query.filters)
+
+    return _fn
+
+
+# ========== Persisted node table ==========
+
+class NodeTable:
+    """Node ids, ref doc ids and metadata of a persisted vector store, read on demand.
+
+    Rows are keyed by the store's row number or label, so a query that only
+    needs the ids of its top-k results reads k rows instead of the whole table.
+    The connection is reopened after a fork, like SQLiteKVStore's.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def write(
+        path: Path, rows: Iterable[Tuple[int, str, Optional[str], Dict[str, Any]]]
+    ) -> None:
+        """Write ``(key, node id, ref doc id, metadata)`` rows to a new table at ``path``."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(str(tmp_path))
+        try:
+            conn.execute(
+                "CREATE TABLE nodes (key INTEGER PRIMARY KEY, node_id TEXT NOT NULL, "
+                "ref_doc_id TEXT, metadata TEXT NOT NULL)"
+            )
+            conn.executemany(
+                "INSERT INTO nodes (key, node_id, ref_doc_id, metadata) VALUES (?, ?, ?, ?)",
+                (
+                    (key, node_id, ref_doc_id, json.dumps(metadata, separators=(",", ":")))
+                    for key, node_id, ref_doc_id, metadata in rows
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        # Write-then-rename, like the vectors: open readers keep the old file
+        os.replace(tmp_path, path)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def node_ids(self, keys: Sequence[int]) -> List[str]:
+        """Node ids for ``keys``, in order."""
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            found = dict(
+                self._connection().execute(
+                    f"SELECT key, node_id FROM nodes WHERE key IN ({placeholders})",
+                    [int(key) for key in keys],
+                )
+            )
+        return [found[int(key)] for key in keys]
+
+    def load_all(self) -> List[Tuple[int, str, Optional[str], Dict[str, Any]]]:
+        """Every row, ordered by key."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT key, node_id, ref_doc_id, metadata FROM nodes ORDER BY key"
+            ).fetchall()
+        return [(key, nid, ref, json.loads(meta)) for key, nid, ref, meta in rows]
+
+
+def _needs_node_table(query: VectorStoreQuery) -> bool:
+    """Whether ``query`` filters on metadata, doc ids or node ids."""
+    return bool((query.filters and query.filters.filters) or query.doc_ids or query.node_ids)
+
+
+# ========== HNSW backend ==========
+
+class HnswVectorStore(BasePydanticVectorStore):
+    """Approximate nearest neighbour vector store backed by an on-disk hnswlib index.
+
+    Only ids, embeddings, ref doc ids and metadata are kept; node text lives in
+    the docstore (``stores_text`` is False), like the default SimpleVectorStore.
+    A persisted store reads the ids of query results from its node table, and
+    only loads the whole table for filtered queries and writes.
+    """
+
+    stores_text: bool = False
+    flat_metadata: bool = False
+
+    space: str = "cosine"
+    m: int = 16
+    ef_construction: int = 200
+    ef_search: int = 64
+
+    _index: Any = PrivateAttr(default=None)
+    _dim: Optional[int] = PrivateAttr(default=None)
+    _label_to_id: Dict[int, str] = PrivateAttr(default_factory=dict)
+    _id_to_label: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _ref_doc_ids: Dict[str, Optional[str]] = PrivateAttr(default_factory=dict)
+    _metadata: Dict[str, Dict[str, Any]] = PrivateAttr(default_factory=dict)
+    _next_label: int = PrivateAttr(default=0)
+    # persisted node table not read yet, and the number of live nodes in it
+    _node_table: Optional[NodeTable] = PrivateAttr(default=None)
+    _persisted_count: int = PrivateAttr(default=0)
+
+    DIRNAME: ClassVar[str] = "hnsw_vector_store"
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HnswVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return self._index
+
+    @staticmethod
+    def _hnswlib():
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError(
+                "RAG_VECTOR_STORE=hnsw requires hnswlib: pip install hnswlib"
+            ) from e
+        return hnswlib
+
+    def _ensure_loaded(self) -> None:
+        """Read the persisted node table; needed to add, delete or filter."""
+        table, self._node_table = self._node_table, None
+        if table is None:
+            return
+        for label, node_id, ref_doc_id, metadata in table.load_all():
+            self._label_to_id[label] = node_id
+            self._id_to_label[node_id] = label
+            self._ref_doc_ids[node_id] = ref_doc_id
+            self._metadata[node_id] = metadata
+
+    def _count(self) -> int:
+        return self._persisted_count if self._node_table is not None else len(self._label_to_id)
+
+    def _ensure_index(self, dim: int, extra: int) -> None:
+        if self._index is None:
+            self._dim = dim
+            self._index = self._hnswlib().Index(space=self.space, dim=dim)
+            self._index.init_index(
+                max_elements=max(1024, extra),
+                ef_construction=self.ef_construction,
+                M=self.m,
+                allow_replace_deleted=True,
+            )
+            self._index.set_ef(self.ef_search)
+        needed = self._index.get_current_count() + extra
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        self._ensure_loaded()
+        embeddings = [node.get_embedding() for node in nodes]
+        self._ensure_index(len(embeddings[0]), len(nodes))
+
+        labels = []
+        for node in nodes:
+            # re-adding a node replaces its previous vector
+            old_label = self._id_to_label.pop(node.node_id, None)
+            if old_label is not None:
+                self._index.mark_deleted(old_label)
+                self._label_to_id.pop(old_label, None)
+            label = self._next_label
+            self._next_label += 1
+            labels.append(label)
+            self._label_to_id[label] = node.node_id
+            self._id_to_label[node.node_id] = label
+            self._ref_doc_ids[node.node_id] = node.ref_doc_id
+            self._metadata[node.node_id] = dict(node.metadata)
+
+        self._index.add_items(embeddings, labels, replace_deleted=True)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._ensure_loaded()
+        node_ids = [nid for nid, ref in self._ref_doc_ids.items() if ref == ref_doc_id]
+        for node_id in node_ids:
+            label = self._id_to_label.pop(node_id, None)
+            if label is not None:
+                self._index.mark_deleted(label)
+                self._label_to_id.pop(label, None)
+            self._ref_doc_ids.pop(node_id, None)
+            self._metadata.pop(node_id, None)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if _needs_node_table(query):
+            self._ensure_loaded()
+        if self._index is None or not self._count() or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        predicate = query_filter_fn(
+            query, lambda nid: self._metadata.get(nid, {}), self._ref_doc_ids.get
+        )
+        label_filter = None
+        if predicate is not None:
+            def label_filter(label: int) -> bool:
+                node_id = self._label_to_id.get(label)
+                return node_id is not None and predicate(node_id)
+
+        k = min(query.similarity_top_k, self._count())
+        while k > 0:
+            try:
+                labels, distances = self._index.knn_query(
+                    [query.query_embedding], k=k, filter=label_filter
+                )
+                break
+            except RuntimeError:
+                # fewer than k nodes pass the filter
+                k //= 2
+        else:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        if self._node_table is not None:
+            ids = self._node_table.node_ids(labels[0].tolist())
+        else:
+            ids = [self._label_to_id[int(label)] for label in labels[0]]
+        similarities = [1.0 - float(d) for d in distances[0]]
+        return VectorStoreQueryResult(nodes=None, similarities=similarities, ids=ids)
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        """Write the index next to the other stores in ``persist_path``'s directory."""
+        self._ensure_loaded()
+        store_dir = Path(persist_path).parent / self.DIRNAME
+        store_dir.mkdir(parents=True, exist_ok=True)
+        if self._index is not None:
+            self._index.save_index(str(store_dir / "index.bin"))
+        NodeTable.write(
+            store_dir / NODE_TABLE_FILENAME,
+            (
+                (label, nid, self._ref_doc_ids.get(nid), self._metadata.get(nid, {}))
+                for label, nid in self._label_to_id.items()
+            ),
+        )
+        meta = {
+            "dim": self._dim,
+            "space": self.space,
+            "next_label": self._next_label,
+            "count": len(self._label_to_id),
+        }
+        with open(store_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: Path, **kwargs: Any) -> "HnswVectorStore":
+        store_dir = Path(persist_dir) / cls.DIRNAME
+        with open(store_dir / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        store = cls(space=meta.get("space", "cosine"), **kwargs)
+        store._dim = meta["dim"]
+        store._next_label = meta["next_label"]
+        if "labels" in meta:
+            # stores persisted before the node table kept everything in meta.json
+            store._label_to_id = {int(label): nid for label, nid in meta["labels"].items()}
+            store._id_to_label = {nid: label for label, nid in store._label_to_id.items()}
+            store._ref_doc_ids = meta["ref_doc_ids"]
+            store._metadata = meta["metadata"]
+        else:
+            store._node_table = NodeTable(store_dir / NODE_TABLE_FILENAME)
+            store._persisted_count = meta["count"]
+        index_path = store_dir / "index.bin"
+        if store._dim and index_path.exists():
+            store._index = cls._hnswlib().Index(space=store.space, dim=store._dim)
+            store._index.load_index(str(index_path), allow_replace_deleted=True)
+            store._index.set_ef(store.ef_search)
+        return store
+
+
+# ========== NumPy brute-force backend ==========
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """Exact vector store keeping all embeddings in one contiguous float32 matrix.
+
+    Rows are L2-normalized when added, so top-k is a single matrix-vector product
+    followed by ``argpartition``. Metadata filters are evaluated as boolean masks
+    over per-key metadata columns before scoring.
+
+    A persisted store memory-maps the matrix and reads node ids from its node
+    table per query; metadata is only loaded for filtered queries and writes.
+    """
+
+    stores_text: bool = False
+    flat_metadata: bool = False
+
+    _matrix: Any = PrivateAttr(default=None)
+    _pending: List[Any] = PrivateAttr(default_factory=list)
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[Optional[str]] = PrivateAttr(default_factory=list)
+    _metadata: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _columns: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _store_dir: Optional[Path] = PrivateAttr(default=None)
+    # persisted node table not read yet (rows are only mapped)
+    _node_table: Optional[NodeTable] = PrivateAttr(default=None)
+
+    DIRNAME: ClassVar[str] = "numpy_vector_store"
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return self._vectors()
+
+    def _open(self) -> None:
+        """Open a persisted store on first use: memory-map the matrix, and leave
+        the node table on disk until something needs more than result ids."""
+        store_dir, self._store_dir = self._store_dir, None
+        if store_dir is None:
+            return
+        table_path = store_dir / NODE_TABLE_FILENAME
+        if table_path.exists():
+            self._node_table = NodeTable(table_path)
+        else:
+            # stores persisted before the node table kept it in nodes.json
+            with open(store_dir / "nodes.json", "r", encoding="utf-8") as f:
+                nodes = json.load(f)
+            self._ids = nodes["ids"]
+            self._ref_doc_ids = nodes["ref_doc_ids"]
+            self._metadata = nodes["metadata"]
+        # rows were normalized when added; pages are shared between processes
+        matrix = np.load(store_dir / "vectors.npy", mmap_mode="r")
+        if len(matrix):
+            self._matrix = matrix
+
+    def _ensure_loaded(self) -> None:
+        """Read the whole node table; needed to add, delete, filter or persist."""
+        self._open()
+        table, self._node_table = self._node_table, None
+        if table is None:
+            return
+        rows = table.load_all()
+        self._ids = [node_id for _, node_id, _, _ in rows]
+        self._ref_doc_ids = [ref_doc_id for _, _, ref_doc_id, _ in rows]
+        self._metadata = [metadata for _, _, _, metadata in rows]
+        self._invalidate()
+
+    def _vectors(self) -> np.ndarray:
+        """The embedding matrix, folding in rows added since the last call."""
+        self._open()
+        if self._pending:
+            blocks = ([self._matrix] if self._matrix is not None else []) + self._pending
+            self._matrix = np.ascontiguousarray(np.vstack(blocks), dtype=np.float32)
+            self._pending = []
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    def _invalidate(self) -> None:
+        self._columns = {}
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        self._ensure_loaded()
+        new_ids = {node.node_id for node in nodes}
+        if new_ids.intersection(self._ids):
+            # re-adding a node replaces its previous vector
+            self._remove_rows([i for i, nid in enumerate(self._ids) if nid in new_ids])
+
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        self._pending.append(self._normalize(vectors))
+        for node in nodes:
+            self._ids.append(node.node_id)
+            self._ref_doc_ids.append(node.ref_doc_id)
+            self._metadata.append(dict(node.metadata))
+        self._invalidate()
+        return [node.node_id for node in nodes]
+
+    def _remove_rows(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        matrix = self._vectors()
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[rows] = False
+        self._matrix = np.ascontiguousarray(matrix[keep])
+        self._ids = [v for v, k in zip(self._ids, keep) if k]
+        self._ref_doc_ids = [v for v, k in zip(self._ref_doc_ids, keep) if k]
+        self._metadata = [v for v, k in zip(self._metadata, keep) if k]
+        self._invalidate()
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._ensure_loaded()
+        self._remove_rows([i for i, ref in enumerate(self._ref_doc_ids) if ref == ref_doc_id])
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            column = np.empty(len(self._metadata), dtype=object)
+            column[:] = [meta.get(key) for meta in self._metadata]
+            self._columns[key] = column
+        return column
+
+    def _filter_mask(self, filters: MetadataFilters) -> np.ndarray:
+        masks = []
+        for f in filters.filters:
+            if isinstance(f, MetadataFilters):
+                masks.append(self._filter_mask(f))
+                continue
+            column = self._column(f.key)
+            if f.operator == FilterOperator.EQ:
+                masks.append(column == f.value)
+            elif f.operator == FilterOperator.NE:
+                masks.append(column != f.value)
+            elif f.operator == FilterOperator.IN:
+                mask = np.zeros(len(column), dtype=bool)
+                for value in f.value:
+                    mask |= column == value
+                masks.append(mask)
+            else:
+                masks.append(
+                    np.fromiter(
+                        (_match_filter(v, f) for v in column), dtype=bool, count=len(column)
+                    )
+                )
+        if not masks:
+            return np.ones(len(self._ids), dtype=bool)
+        combine = np.logical_or if filters.condition == FilterCondition.OR else np.logical_and
+        return combine.reduce(np.asarray(masks, dtype=bool), axis=0)
+
+    def _query_mask(self, query: VectorStoreQuery) -> Optional[np.ndarray]:
+        mask = None
+        if query.filters is not None and query.filters.filters:
+            mask = self._filter_mask(query.filters)
+        for allowed, values in (
+            (query.doc_ids, self._ref_doc_ids),
+            (query.node_ids, self._ids),
+        ):
+            if allowed:
+                allowed = set(allowed)
+                id_mask = np.fromiter((v in allowed for v in values), dtype=bool, count=len(values))
+                mask = id_mask if mask is None else mask & id_mask
+        return mask
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if _needs_node_table(query):
+            self._ensure_loaded()
+        matrix = self._vectors()
+        if not len(matrix) or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        q = self._normalize(np.asarray(query.query_embedding, dtype=np.float32))
+        mask = self._query_mask(query)
+        if mask is None:
+            rows = None
+            scores = matrix @ q
+        else:
+            rows = np.flatnonzero(mask)
+            scores = matrix[rows] @ q
+
+        k = min(query.similarity_top_k, len(scores))
+        if k <= 0:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        result_rows = top if rows is None else rows[top]
+        if self._node_table is not None:
+            ids = self._node_table.node_ids(result_rows.tolist())
+        else:
+            ids = [self._ids[i] for i in result_rows]
+        return VectorStoreQueryResult(
+            nodes=None, similarities=scores[top].tolist(), ids=ids
+        )
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        """Write the matrix and node table next to the other stores in ``persist_path``'s directory."""
+        self._ensure_loaded()
+        store_dir = Path(persist_path).parent / self.DIRNAME
+        store_dir.mkdir(parents=True, exist_ok=True)
+        vectors = self._vectors()
+        # Write-then-rename: processes that memory-mapped the old file keep a valid mapping
+        tmp_vectors = store_dir / "vectors.tmp.npy"
+        np.save(tmp_vectors, np.asarray(vectors, dtype=np.float32))
+        NodeTable.write(
+            store_dir / NODE_TABLE_FILENAME,
+            (
+                (row, node_id, ref_doc_id, metadata)
+                for row, (node_id, ref_doc_id, metadata) in enumerate(
+                    zip(self._ids, self._ref_doc_ids, self._metadata)
+                )
+            ),
+        )
+        os.replace(tmp_vectors, store_dir / "vectors.npy")
+        (store_dir / "nodes.json").unlink(missing_ok=True)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: Path, **kwargs: Any) -> "NumpyVectorStore":
+        """Open a persisted store; nothing is read until the first add/delete/query."""
+        store = cls(**kwargs)
+        store._store_dir = Path(persist_dir) / cls.DIRNAME
+        return store
+
+
+# ========== Backend selection ==========
+
+_BACKENDS = {
+    HNSW_BACKEND: HnswVectorStore,
+    NUMPY_BACKEND: NumpyVectorStore,
+}
+
+
+def detect_backend(persist_dir: Path) -> str:
+    """Return the backend an existing index directory was persisted with."""
+    for name, store_cls in _BACKENDS.items():
+        if (Path(persist_dir) / store_cls.DIRNAME).exists():
+            return name
+    return SIMPLE_BACKEND
+
+
+def _binary_stores(persist_dir: Path) -> Dict[str, Any]:
+    """Docstore and index store reading from the SQLite node database on demand."""
+    kvstore = SQLiteKVStore(Path(persist_dir) / NODE_DB_FILENAME)
+    return {
+        "docstore": KVDocumentStore(kvstore),
+        "index_store": KVIndexStore(kvstore),
+    }
+
+
+def detect_storage_format(persist_dir: Path) -> str:
+    """Return the storage format an existing index directory was persisted with."""
+    if (Path(persist_dir) / NODE_DB_FILENAME).exists():
+        return BINARY_FORMAT
+    return JSON_FORMAT
+
+
+def new_storage_context(
+    backend: Optional[str] = None,
+    persist_dir: Optional[Path] = None,
+    storage_format: Optional[str] = None,
+) -> StorageContext:
+    """Storage context for building a new index with the configured backend.
+
+    The binary format writes nodes straight into ``persist_dir``'s SQLite node
+    database, so ``persist_dir`` is required for it; without one the index is
+    built with the JSON format.
+    """
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    storage_format = (storage_format or STORAGE_FORMAT).lower()
+    if backend != SIMPLE_BACKEND and backend not in _BACKENDS:
+        raise ValueError(
+            f"Unknown RAG_VECTOR_STORE '{backend}', expected one of "
+            f"{[SIMPLE_BACKEND, *_BACKENDS]}"
+        )
+
+    stores: Dict[str, Any] = {}
+    if storage_format == BINARY_FORMAT and persist_dir is not None:
+        stores = _binary_stores(persist_dir)
+        if backend == SIMPLE_BACKEND:
+            # the simple store is JSON; vectors go to a raw float32 .npy file instead
+            backend = NUMPY_BACKEND
+    if backend != SIMPLE_BACKEND:
+        stores["vector_store"] = _BACKENDS[backend]()
+    return StorageContext.from_defaults(**stores)
+
+
+def load_storage_context(persist_dir: Path) -> StorageContext:
+    """Storage context for an existing index, using the backend it was built with."""
+    # Resolve the published-version symlink once so every file comes from one version
+    persist_dir = Path(persist_dir).resolve()
+    backend = detect_backend(persist_dir)
+    storage_format = detect_storage_format(persist_dir)
+    if backend != VECTOR_STORE_BACKEND or storage_format != STORAGE_FORMAT:
+        logger.info(
+            f"Index at {persist_dir} uses the '{backend}' vector store and "
+            f"'{storage_format}' format; rebuild to apply RAG_VECTOR_STORE / "
+            "RAG_STORAGE_FORMAT changes"
+        )
+    vector_store = None
+    if backend != SIMPLE_BACKEND:
+        vector_store = _BACKENDS[backend].from_persist_dir(persist_dir)
+    if storage_format == BINARY_FORMAT:
+        return StorageContext.from_defaults(
+            vector_store=vector_store, **_binary_stores(persist_dir)
+        )
+    return StorageContext.from_defaults(persist_dir=persist_dir, vector_store=vector_store)
+
+
+def load_persisted_index(persist_dir: Path):
+    """Load the index persisted in ``persist_dir`` with its vector store backend."""
+    return load_index_from_storage(load_storage_context(persist_dir))
@@ -8,7 +8,7 @@ from google.genai import types
 
 # Add src directory to path so we can import agent
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-from agent import Assistant
+from agent import Assistant, ParticipantPreferences, extract_user_id
 
 
 def _llm() -> llm.LLM:
@@ -20,6 +20,48 @@ def _llm() -> llm.LLM:
     )
 
 
+def test_extract_user_id_from_room_name() -> None:
+    uuid = "123e4567-e89b-12d3-a456-426614174000"
+
+    assert extract_user_id(f"mindcure-{uuid}-ab12") == uuid
+    assert extract_user_id("mindcure-demo") == "demo"
+    assert extract_user_id("other-room") is None
+    assert extract_user_id("") is None
+
+
+class _FakeParticipant:
+    def __init__(self, metadata: str = "") -> None:
+        self.metadata = metadata
+
+
+class _FakeRoom:
+    def __init__(self) -> None:
+        self.remote_participants = {}
+        self.local_participant = _FakeParticipant()
+        self.handlers = {}
+
+    def on(self, event, callback) -> None:
+        self.handlers[event] = callback
+
+
+@pytest.mark.asyncio
+async def test_preferences_arrive_through_room_events() -> None:
+    room = _FakeRoom()
+    preferences = ParticipantPreferences(room)
+
+    # nothing set yet: the deadline passes and defaults apply
+    assert await preferences.wait(0.01) is None
+
+    changes = []
+    preferences.on_change(changes.append)
+    user = _FakeParticipant()
+    room.handlers["participant_connected"](user)
+    room.handlers["participant_metadata_changed"](user, "", '{"voice": "Puck", "genz_mode": true}')
+
+    assert await preferences.wait(0.01) == {"voice": "Puck", "genz_mode": True}
+    assert changes == [{"voice": "Puck", "genz_mode": True}]
+
+
 @pytest.mark.asyncio
 async def test_offers_assistance() -> None:
     """Test that the agent responds to greetings."""
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import answer_cache
+from answer_cache import SemanticAnswerCache, answer_cache_stats, cached_answer
+
+
+def test_similar_query_hits_and_dissimilar_misses(tmp_path) -> None:
+    cache = SemanticAnswerCache(tmp_path / "answers.sqlite3", threshold=0.9)
+    cache.store("livekit", "panic attacks", [1.0, 0.0, 0.0], "Breathe slowly.", 1, 2.0)
+
+    assert cache.lookup("livekit", [0.99, 0.05, 0.0], 1) == ("Breathe slowly.", 2.0)
+    assert cache.lookup("livekit", [0.0, 1.0, 0.0], 1) is None
+    assert cache.lookup("other", [1.0, 0.0, 0.0], 1) is None
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_index_version_bump_invalidates_entries(tmp_path) -> None:
+    cache = SemanticAnswerCache(tmp_path / "answers.sqlite3", prune_every=1)
+    cache.store("livekit", "q", [1.0, 0.0], "old answer", 1, 1.0)
+
+    assert cache.lookup("livekit", [1.0, 0.0], 2) is None
+
+    cache.store("livekit", "q", [1.0, 0.0], "new answer", 2, 1.0)
+    assert len(cache) == 1
+    assert cache.lookup("livekit", [1.0, 0.0], 2)[0] == "new answer"
+
+
+def test_expired_entries_are_ignored(tmp_path) -> None:
+    cache = SemanticAnswerCache(tmp_path / "answers.sqlite3", ttl_seconds=-1)
+    cache.store("livekit", "q", [1.0, 0.0], "answer", 1, 1.0)
+
+    assert cache.lookup("livekit", [1.0, 0.0], 1) is None
+
+
+def test_writes_from_another_process_are_visible(tmp_path) -> None:
+    reader = SemanticAnswerCache(tmp_path / "answers.sqlite3")
+    writer = SemanticAnswerCache(tmp_path / "answers.sqlite3")
+
+    assert reader.lookup("livekit", [1.0, 0.0], 1) is None
+    writer.store("livekit", "q", [1.0, 0.0], "answer", 1, 1.0)
+    assert reader.lookup("livekit", [1.0, 0.0], 1) == ("answer", 1.0)
+
+
+def test_stores_extend_the_loaded_vectors_in_place(tmp_path) -> None:
+    cache = SemanticAnswerCache(tmp_path / "answers.sqlite3")
+    cache.store("livekit", "q1", [1.0, 0.0], "first", 1, 1.0)
+    assert cache.lookup("livekit", [1.0, 0.0], 1) == ("first", 1.0)
+    assert cache.lookup("other", [1.0, 0.0], 1) is None
+
+    cache.store("livekit", "q2", [0.0, 1.0], "second", 1, 2.0)
+
+    # the other namespace's vectors are kept, and the new row is served
+    # without reloading from SQLite
+    assert ("other", 1) in cache._matrices
+    assert len(cache._matrices[("livekit", 1)][0]) == 2
+    assert cache.lookup("livekit", [0.0, 1.0], 1) == ("second", 2.0)
+
+
+class _FixedEmbedding:
+    async def aget_query_embedding(self, query):
+        return [1.0, 0.0]
+
+
+async def test_cached_answer_exports_hit_and_miss_counters(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(answer_cache, "_shared_cache", None)
+    assert answer_cache_stats() is None
+
+    cache = SemanticAnswerCache(tmp_path / "answers.sqlite3")
+    monkeypatch.setattr(answer_cache, "_shared_cache", cache)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "Breathe slowly."
+
+    for _ in range(3):
+        answer = await cached_answer("livekit", "panic", compute, 1, embed_model=_FixedEmbedding())
+        assert answer == "Breathe slowly."
+
+    stats = answer_cache_stats()
+    assert len(calls) == 1
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["saved_seconds"] >= 0.0
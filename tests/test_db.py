@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from db import execute
+
+
+class SlowQuery:
+    """Stands in for a supabase query builder whose execute() blocks."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.thread = None
+
+    def execute(self):
+        self.thread = threading.current_thread()
+        time.sleep(self.delay)
+        return "result"
+
+
+@pytest.mark.asyncio
+async def test_execute_runs_off_the_event_loop_concurrently() -> None:
+    queries = [SlowQuery(0.2) for _ in range(3)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(execute(q) for q in queries))
+
+    assert results == ["result"] * 3
+    assert time.perf_counter() - start < 0.5
+    assert all(q.thread is not threading.current_thread() for q in queries)
+
+
+@pytest.mark.asyncio
+async def test_execute_times_out() -> None:
+    with pytest.raises(asyncio.TimeoutError):
+        await execute(SlowQuery(0.5), timeout=0.05)
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from embedding_cache import CachedEmbedding, EmbeddingCache, cache_key
+from llama_index.core.embeddings import MockEmbedding
+
+
+class CountingEmbedding(MockEmbedding):
+    """MockEmbedding that counts how many texts reach the 'API'."""
+
+    calls: int = 0
+
+    def _get_text_embedding(self, text):
+        self.calls += 1
+        return super()._get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text):
+        self.calls += 1
+        return await super()._aget_text_embedding(text)
+
+
+def test_cache_round_trip_and_counters(tmp_path) -> None:
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", max_entries=10)
+    key = cache_key("model", "text", "hello   world")
+
+    assert cache.get(key) is None
+    cache.put(key, [0.5, 0.25])
+
+    # whitespace-normalized text maps to the same entry
+    assert cache.get(cache_key("model", "text", "hello world")) == [0.5, 0.25]
+    assert cache.hits == 1
+    assert cache.misses == 1
+    # the indexer's "models/" spelling shares entries with the query side
+    assert cache_key("models/text-embedding-004", "text", "hi") == cache_key("text-embedding-004", "text", "hi")
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")  # refresh "a" so "b" is the LRU entry
+    cache.put("c", [3.0])
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+
+
+def test_reads_flush_access_times_past_the_threshold(tmp_path) -> None:
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", access_flush_entries=2)
+    cache.put_many({"a": [1.0], "b": [2.0]})
+    cache._conn.execute("UPDATE embeddings SET last_access = 0")
+
+    cache.get("a")
+    assert len(cache._accessed) == 1
+    cache.get("b")
+
+    # two pending access times reach the threshold: written without any put
+    assert cache._accessed == {}
+    rows = cache._conn.execute("SELECT last_access FROM embeddings").fetchall()
+    assert all(last_access > 0 for (last_access,) in rows)
+
+
+@pytest.mark.asyncio
+async def test_cached_embedding_only_embeds_misses(tmp_path) -> None:
+    inner = CountingEmbedding(embed_dim=4)
+    model = CachedEmbedding(inner, EmbeddingCache(tmp_path / "cache.sqlite3"))
+
+    first = model.get_text_embedding_batch(["a", "b"])
+    second = await model.aget_text_embedding_batch(["a", "b", "c"])
+
+    assert second[:2] == first
+    assert inner.calls == 3
@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from index_pipeline import _shards, parse_nodes
+from llama_index.core import Document
+from llama_index.core.node_parser import SentenceSplitter
+
+
+def _documents():
+    text = " ".join(f"Sentence number {i} about coping with stress." for i in range(200))
+    return [Document(text=text, id_=f"guide.pdf_part_{i}") for i in range(5)]
+
+
+def test_shards_are_contiguous_and_cover_everything() -> None:
+    shards = _shards(list(range(10)), 3)
+
+    assert shards == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_parallel_chunking_matches_single_process() -> None:
+    splitter = [SentenceSplitter(chunk_size=128, chunk_overlap=0)]
+
+    serial = parse_nodes(_documents(), splitter, workers=1)
+    parallel = parse_nodes(_documents(), splitter, workers=2)
+
+    assert [n.node_id for n in parallel] == [n.node_id for n in serial]
+    assert [n.get_content() for n in parallel] == [n.get_content() for n in serial]
+    assert serial[0].node_id == "guide.pdf_part_0_node_0"
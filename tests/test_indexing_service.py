@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from indexing_service import FAILED, SUCCEEDED, IndexingJobQueue, _make_handler
+
+
+def _wait_for(jobs, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_requests_made_while_a_job_is_queued_are_coalesced() -> None:
+    release = threading.Event()
+    runs = []
+
+    def runner(full_rebuild, progress):
+        runs.append(full_rebuild)
+        progress("files", 1, 1)
+        release.wait(5)
+        return True
+
+    jobs = IndexingJobQueue(runner)
+    jobs.start()
+
+    running = jobs.submit()
+    while jobs.get(running["id"])["status"] != "running":
+        time.sleep(0.01)
+
+    # the first job is running, so these two share one new job
+    queued = jobs.submit()
+    coalesced = jobs.submit(full_rebuild=True)
+    assert coalesced["id"] == queued["id"]
+    assert coalesced["requests"] == 2
+
+    release.set()
+    assert _wait_for(jobs, running["id"])["progress"] == {"stage": "files", "done": 1, "total": 1}
+    assert _wait_for(jobs, queued["id"])["status"] == SUCCEEDED
+    assert runs == [False, True]
+
+
+def test_failed_runs_are_reported() -> None:
+    def runner(full_rebuild, progress):
+        raise RuntimeError("quota exceeded")
+
+    jobs = IndexingJobQueue(runner)
+    jobs.start()
+    job = _wait_for(jobs, jobs.submit()["id"])
+
+    assert job["status"] == FAILED
+    assert job["error"] == "quota exceeded"
+
+
+def test_non_object_json_bodies_are_rejected() -> None:
+    jobs = IndexingJobQueue(lambda full_rebuild, progress: True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(jobs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/jobs"
+    try:
+        for body in (b"[]", b'"x"', b"1"):
+            request = urllib.request.Request(url, data=body, method="POST")
+            try:
+                urllib.request.urlopen(request, timeout=5)
+            except urllib.error.HTTPError as e:
+                assert e.code == 400
+                assert "object" in json.loads(e.read())["error"]
+            else:
+                raise AssertionError(f"{body!r} was accepted")
+    finally:
+        server.shutdown()
+        server.server_close()
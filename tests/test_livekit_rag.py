@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import MockLLM
+import rag_models
+from index_pipeline import build_and_persist_index
+
+
+def test_reload_swaps_in_components_built_for_the_new_index(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("EMBEDDING_CACHE_DISABLED", "1")
+    monkeypatch.setattr(Settings, "_llm", None)
+    monkeypatch.setattr(Settings, "_embed_model", None)
+    monkeypatch.setattr(rag_models, "_override", (MockLLM(max_tokens=8), MockEmbedding(embed_dim=8)))
+    import livekit_rag
+
+    data_dir, persist_dir = tmp_path / "data", tmp_path / "query-engine-storage"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("Breathe in for four counts.")
+    for name, value in (
+        ("DATA_DIR", data_dir),
+        ("PERSIST_DIR", persist_dir),
+        ("index", None),
+        ("_loaded_dir", None),
+        ("_query_engines", {}),
+        ("_engines_index", None),
+    ):
+        monkeypatch.setattr(livekit_rag, name, value)
+
+    livekit_rag.load_index()
+    old_engine = livekit_rag.get_query_engine()
+    old_retriever = livekit_rag.get_retriever(3)
+
+    (data_dir / "b.txt").write_text("Breathe out for six counts.")
+    build_and_persist_index(data_dir, persist_dir)
+    assert livekit_rag.reload_index_if_changed()
+
+    # every component cached for the old index was rebuilt before the swap
+    assert livekit_rag._engines_index is livekit_rag.index
+    assert set(livekit_rag._query_engines) == {("engine", 2), ("retriever", 3)}
+    new_engine = livekit_rag.get_query_engine()
+    assert new_engine is livekit_rag._query_engines[("engine", 2)]
+    assert new_engine is not old_engine
+    assert livekit_rag.get_retriever(3) is not old_retriever
@@ -0,0 +1,91 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from rag_index import (
+    current_index_dir,
+    publish_index_version,
+    read_index_version,
+    save_manifest,
+    stage_index_version,
+    sync_data_dir,
+    versions_root,
+)
+
+
+def test_publish_swaps_symlink_and_prunes_old_versions(tmp_path) -> None:
+    persist_dir = tmp_path / "query-engine-storage"
+
+    published = []
+    for i in range(4):
+        version_dir = stage_index_version(persist_dir, copy_current=True)
+        (version_dir / f"file_{i}.json").write_text("{}")
+        publish_index_version(persist_dir, version_dir, keep=2, grace_seconds=0)
+        published.append(version_dir)
+
+    assert persist_dir.is_symlink()
+    assert current_index_dir(persist_dir) == published[-1].resolve()
+    # the copy carried the previous versions' files forward
+    assert sorted(p.name for p in persist_dir.iterdir()) == [f"file_{i}.json" for i in range(4)]
+    assert sorted(versions_root(persist_dir).iterdir()) == published[-2:]
+
+
+def test_recently_superseded_versions_are_kept(tmp_path) -> None:
+    persist_dir = tmp_path / "query-engine-storage"
+
+    published = []
+    for _ in range(3):
+        version_dir = stage_index_version(persist_dir, copy_current=True)
+        publish_index_version(persist_dir, version_dir, keep=1, grace_seconds=60)
+        published.append(version_dir)
+
+    # workers that have not reloaded yet may still be reading the older versions
+    assert sorted(versions_root(persist_dir).iterdir()) == published
+
+
+def test_legacy_directory_is_migrated(tmp_path) -> None:
+    persist_dir = tmp_path / "query-engine-storage"
+    persist_dir.mkdir()
+    save_manifest(persist_dir, {})
+    legacy_version = read_index_version(persist_dir)
+
+    version_dir = stage_index_version(persist_dir, copy_current=True)
+    save_manifest(version_dir, {})
+    publish_index_version(persist_dir, version_dir)
+
+    assert persist_dir.is_symlink()
+    assert read_index_version(persist_dir) > legacy_version
+    assert any(d.name.endswith("-legacy") for d in versions_root(persist_dir).iterdir())
+
+
+class _CountingEmbedding(MockEmbedding):
+    batches: list = []
+
+    async def _aget_text_embeddings(self, texts):
+        self.batches.append(len(texts))
+        return await super()._aget_text_embeddings(texts)
+
+
+def test_sync_embeds_new_and_changed_files_in_batches(tmp_path, monkeypatch) -> None:
+    embed_model = _CountingEmbedding(embed_dim=8)
+    monkeypatch.setattr(Settings, "_embed_model", embed_model)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("Breathe in for four counts.")
+    (data_dir / "b.txt").write_text("Breathe out for six counts.")
+    index = VectorStoreIndex(nodes=[])
+    manifest_files = {}
+
+    report = sync_data_dir(index, data_dir, manifest_files, files_per_batch=8)
+    assert (report["inserted"], report["updated"]) == (2, 0)
+    # both files' nodes went out in one embedding request
+    assert embed_model.batches == [2]
+
+    (data_dir / "b.txt").write_text("Hold for seven counts.")
+    report = sync_data_dir(index, data_dir, manifest_files)
+    assert (report["inserted"], report["updated"], report["skipped"]) == (0, 1, 1)
+    assert embed_model.batches == [2, 1]
+    texts = sorted(node.get_content() for node in index.docstore.docs.values())
+    assert texts == ["Breathe in for four counts.", "Hold for seven counts."]
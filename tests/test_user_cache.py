@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from user_cache import AsyncTTLCache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_coalesced() -> None:
+    cache = AsyncTTLCache("test", ttl_seconds=60, max_entries=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"name": "Sam"}
+
+    results = await asyncio.gather(*(cache.get_or_load("user", loader) for _ in range(5)))
+
+    assert results == [{"name": "Sam"}] * 5
+    assert len(calls) == 1
+    assert await cache.get_or_load("user", loader) == {"name": "Sam"}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_lru_and_invalidation() -> None:
+    cache = AsyncTTLCache("test", ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    expired = AsyncTTLCache("test", ttl_seconds=0)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+    # a write during the load invalidates it: the stale value is returned, not kept
+    async def loader():
+        await asyncio.sleep(0.05)
+        return "stale"
+
+    load = asyncio.ensure_future(cache.get_or_load("d", loader))
+    await asyncio.sleep(0)
+    cache.invalidate("d")
+    assert await load == "stale"
+    assert cache.get("d") is None
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached() -> None:
+    cache = AsyncTTLCache("test")
+
+    async def failing():
+        raise RuntimeError("timeout")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("user", failing)
+    assert cache.get("user") is None
+
+
+@pytest.mark.asyncio
+async def test_none_is_not_cached() -> None:
+    cache = AsyncTTLCache("test")
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return None  # e.g. no BYOK key: fall back, and check again next join
+
+    assert await cache.get_or_load("user", loader) is None
+    assert await cache.get_or_load("user", loader) is None
+    assert len(calls) == 2
@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import user_context
+from user_cache import invalidate_user, user_context_cache
+from user_context import UserContextManager
+
+USER_ID = "123e4567-e89b-12d3-a456-426614174000"
+
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST query builder."""
+
+    def __init__(self, table, gates, rows):
+        self.table = table
+        self.gates = gates
+        self.rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.rows.setdefault("executed", []).append(self.table)
+        gate = self.gates.get(self.table)
+        if gate is not None:
+            gate()
+        if isinstance(self.rows.get(self.table), Exception):
+            raise self.rows[self.table]
+        return SimpleNamespace(data=self.rows.get(self.table))
+
+
+class FakeSupabase:
+    def __init__(self, gates, rows):
+        self.gates = gates
+        self.rows = rows
+
+    def table(self, name):
+        return FakeQuery(name, self.gates, self.rows)
+
+
+async def test_queries_run_concurrently_with_partial_fallback(monkeypatch) -> None:
+    rows = {
+        "profiles": {"full_name": "Sam", "mental_health_goals": ["sleep better"]},
+        "wellness_metrics": [{"mental_health_score": 72}],
+        "chat_sessions": RuntimeError("connection reset"),
+        "fun_tasks": [{"task_name": "walk"}],
+        "achievements": [],
+    }
+    # the four fast queries only get past the barrier if they are all in
+    # flight at once; the barrier timeout only guards against a hang
+    all_in_flight = threading.Barrier(4, timeout=10)
+    release_slow = threading.Event()
+    slow_finished = threading.Event()
+
+    def slow_query():
+        # held until after the load returns, so it can only time out
+        release_slow.wait(10)
+        slow_finished.set()
+
+    gates = {
+        name: all_in_flight.wait
+        for name in ("profiles", "wellness_metrics", "chat_sessions", "fun_tasks")
+    }
+    gates["achievements"] = slow_query
+    monkeypatch.setattr(user_context, "supabase", FakeSupabase(gates, rows))
+    monkeypatch.setattr(user_context, "CONTEXT_QUERY_TIMEOUT", 0.2)
+    user_context_cache.clear()
+
+    try:
+        context = await UserContextManager().load_user_context(USER_ID)
+        # the slow query was still running: it timed out and fell back
+        assert not slow_finished.is_set()
+    finally:
+        release_slow.set()
+        assert slow_finished.wait(10)
+
+    assert not all_in_flight.broken
+    assert context["name"] == "Sam"
+    assert context["current_scores"]["mental_health"] == 72
+    assert context["recent_conversations"] == []
+    assert context["pending_tasks"] == [{"task_name": "walk"}]
+    assert context["achievements"] == []
+
+
+async def test_repeated_joins_are_served_from_cache(monkeypatch) -> None:
+    rows = {"profiles": {"full_name": "Sam"}, "wellness_metrics": [], "chat_sessions": [],
+            "fun_tasks": [], "achievements": []}
+    monkeypatch.setattr(user_context, "supabase", FakeSupabase({}, rows))
+    user_context_cache.clear()
+
+    first = await UserContextManager().load_user_context(USER_ID)
+    assert len(rows.pop("executed")) == 5
+
+    # a reconnect makes no database round-trips
+    assert await UserContextManager().load_user_context(USER_ID) == first
+    assert "executed" not in rows
+
+    # until a write for the user invalidates the cached context
+    invalidate_user(USER_ID)
+    await UserContextManager().load_user_context(USER_ID)
+    assert len(rows["executed"]) == 5
@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import MockLLM
+from utils import SOURCE_FILENAME, FileIndexes
+
+
+def test_rebuilding_a_changed_file_prunes_its_stale_indexes(tmp_path, monkeypatch) -> None:
+    # the private fields, so the public setters' default-model resolution is
+    # skipped and the originals are restored after the test
+    monkeypatch.setattr(Settings, "_embed_model", MockEmbedding(embed_dim=8))
+    monkeypatch.setattr(Settings, "_llm", MockLLM(max_tokens=8))
+    storage_root = tmp_path / "file-index-storage"
+    data_file = tmp_path / "guide.txt"
+
+    data_file.write_text("Breathe in for four counts.")
+    FileIndexes(data_file, storage_root=storage_root).load()
+    data_file.write_text("Breathe out for six counts.")
+    FileIndexes(data_file, storage_root=storage_root).load()
+
+    # only the index for the current contents is left, and no temp dirs
+    remaining = list(storage_root.iterdir())
+    assert len(remaining) == 1
+    assert (remaining[0] / SOURCE_FILENAME).exists()
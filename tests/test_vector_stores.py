@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+from sqlite_kvstore import SQLiteKVStore
+from vector_stores import NumpyVectorStore
+
+
+def _node(node_id: str, embedding, doc_id: str, page: str) -> TextNode:
+    return TextNode(
+        id_=node_id,
+        text=node_id,
+        embedding=embedding,
+        metadata={"file_name": f"{doc_id}.pdf", "page_label": page},
+        relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=doc_id)},
+    )
+
+
+def _store() -> NumpyVectorStore:
+    store = NumpyVectorStore()
+    store.add(
+        [
+            _node("a1", [1.0, 0.0], "a", "1"),
+            _node("a2", [0.7, 0.7], "a", "2"),
+            _node("b1", [0.0, 1.0], "b", "1"),
+        ]
+    )
+    return store
+
+
+def test_numpy_store_top_k() -> None:
+    result = _store().query(
+        VectorStoreQuery(query_embedding=[2.0, 0.1], similarity_top_k=2)
+    )
+    assert result.ids == ["a1", "a2"]
+    assert result.similarities[0] > result.similarities[1]
+
+
+def test_numpy_store_metadata_filters() -> None:
+    filters = MetadataFilters(
+        filters=[
+            MetadataFilter(key="file_name", value="a.pdf"),
+            MetadataFilter(key="page_label", value=["2"], operator=FilterOperator.IN),
+        ]
+    )
+    result = _store().query(
+        VectorStoreQuery(query_embedding=[1.0, 0.0], similarity_top_k=3, filters=filters)
+    )
+    assert result.ids == ["a2"]
+
+
+def test_numpy_store_delete_and_persist(tmp_path) -> None:
+    store = _store()
+    store.delete("a")
+    store.persist(str(tmp_path / "default__vector_store.json"))
+
+    loaded = NumpyVectorStore.from_persist_dir(tmp_path)
+    result = loaded.query(VectorStoreQuery(query_embedding=[1.0, 0.0], similarity_top_k=3))
+    assert result.ids == ["b1"]
+
+
+def test_numpy_store_reads_its_node_table_on_demand(tmp_path) -> None:
+    _store().persist(str(tmp_path / "default__vector_store.json"))
+
+    loaded = NumpyVectorStore.from_persist_dir(tmp_path)
+    result = loaded.query(VectorStoreQuery(query_embedding=[0.0, 1.0], similarity_top_k=2))
+    assert result.ids == ["b1", "a2"]
+    # only the ids of the results were read, not the node metadata
+    assert loaded._ids == [] and loaded._metadata == []
+
+    filters = MetadataFilters(filters=[MetadataFilter(key="page_label", value="1")])
+    result = loaded.query(
+        VectorStoreQuery(query_embedding=[0.0, 1.0], similarity_top_k=3, filters=filters)
+    )
+    assert result.ids == ["b1", "a1"]
+
+
+async def test_sqlite_kvstore_async_methods(tmp_path) -> None:
+    kvstore = SQLiteKVStore(tmp_path / "nodes.sqlite3")
+    await kvstore.aput("a", {"text": "one"})
+    await kvstore.aput_all([("b", {"text": "two"})])
+
+    assert await kvstore.aget("a") == {"text": "one"}
+    assert await kvstore.aget_all() == {"a": {"text": "one"}, "b": {"text": "two"}}
+    assert await kvstore.adelete("a")
+    assert await kvstore.aget("a") is None